@@ -0,0 +1,52 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare OLD.json NEW.json [--threshold 1.10]
+
+Prints new/old time and peak-memory ratios per case and exits non-zero when
+any case got slower than the threshold ratio.
+"""
+
+import argparse
+import json
+import sys
+
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        data = json.load(f)
+    return {(r["engine"], r["instruments"], r["days"]): r for r in data["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.10)
+    args = parser.parse_args()
+
+    old = _load(args.old)
+    new = _load(args.new)
+
+    regressions = 0
+    print(f"{'case':<28} {'old ms':>10} {'new ms':>10} {'time':>7} {'memory':>7}")
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        ratio = b["seconds"] / a["seconds"] if a["seconds"] else float("inf")
+        mem = b["peak_mb"] / a["peak_mb"] if a["peak_mb"] else float("inf")
+        flag = "  <-- slower" if ratio > args.threshold else ""
+        regressions += bool(flag)
+        engine, n, d = key
+        print(
+            f"{f'{engine} {n}x{d}':<28} {a['seconds'] * 1000:>10.1f} {b['seconds'] * 1000:>10.1f} "
+            f"{ratio:>6.2f}x {mem:>6.2f}x{flag}"
+        )
+
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{' '.join(map(str, key))}: only in {'old' if key in old else 'new'}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark the compute engines on synthetic portfolios.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 200,2000 --days 250 --engines exit,fragility
+    python -m benchmarks.compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+
+Each (engine, instruments, days) case is timed over --repeat runs (median
+reported) with per-stage timings from core.profiling, then run once more
+under tracemalloc for peak memory. Results are written as JSON named after
+the current commit so runs can be compared between commits. Once an engine
+exceeds --budget seconds, larger cases for it are skipped.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from core.panel import PricePanel
+from core.profiling import record_stages
+from core.sim import synthetic_market
+from features.exit.compute import compute_exit_signals
+from features.fragility.compute import compute_fragility_overview
+from features.portfolio.compute import compute_overview
+from features.portfolio.settings import DEFAULT as PORTFOLIO_DEFAULT, compile_settings
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def build_case(instruments: int, days: int, seed: int):
+    holdings, dates, closes = synthetic_market(instruments, days, seed)
+    df = pd.DataFrame(holdings)
+    panel = PricePanel(
+        tokens=df["instrument_token"].to_numpy(dtype=np.int64),
+        dates=dates.to_numpy().astype("datetime64[D]"),
+        close=closes,
+    )
+
+    # Spread symbols across the default groups, leaving a slice unassigned
+    groups = {g: [] for g in PORTFOLIO_DEFAULT["groups"]}
+    names = list(groups)
+    for i, sym in enumerate(df["tradingsymbol"]):
+        if i % (len(names) + 1) < len(names):
+            groups[names[i % (len(names) + 1)]].append(sym)
+    config = compile_settings({**PORTFOLIO_DEFAULT, "groups": groups})
+
+    listed = ~np.isnan(closes)
+    rows, cols = np.nonzero(listed)
+    long_frame = pd.DataFrame({
+        "instrument_token": panel.tokens[rows],
+        "date": panel.dates[cols],
+        "close": closes[listed],
+    })
+    return df, panel, config, long_frame
+
+
+ENGINES = {
+    "panel": lambda df, panel, config, long_frame: PricePanel.from_long(long_frame),
+    "portfolio": lambda df, panel, config, long_frame: compute_overview(df.copy(), config),
+    "exit": lambda df, panel, config, long_frame: compute_exit_signals(df.copy(), panel),
+    "fragility": lambda df, panel, config, long_frame: compute_fragility_overview(df.copy(), panel),
+}
+
+
+def run_case(engine: str, case, repeat: int) -> dict:
+    fn = ENGINES[engine]
+    seconds = []
+    stages = []
+    for _ in range(repeat):
+        with record_stages() as timings:
+            start = time.perf_counter()
+            fn(*case)
+            seconds.append(time.perf_counter() - start)
+        stages.append(timings)
+
+    tracemalloc.start()
+    fn(*case)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    keys = sorted({k for s in stages for k in s})
+    return {
+        "seconds": statistics.median(seconds),
+        "min_seconds": min(seconds),
+        "stages": {k: statistics.median(s.get(k, 0.0) for s in stages) for k in keys},
+        "peak_mb": round(peak / 2**20, 2),
+    }
+
+
+def _git_sha() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def _ints(text: str) -> list[int]:
+    return [int(x) for x in text.split(",") if x]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=_ints, default=[20, 200, 2000, 10000])
+    parser.add_argument("--days", type=_ints, default=[250, 1000])
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=60.0, help="skip larger cases once an engine exceeds this many seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="result file (default: benchmarks/results/<timestamp>-<sha>.json)")
+    args = parser.parse_args()
+
+    engines = [e for e in args.engines.split(",") if e]
+    over_budget = {e: [] for e in engines}
+    results = []
+
+    for days in sorted(args.days):
+        for instruments in sorted(args.sizes):
+            case = build_case(instruments, days, args.seed)
+            for engine in engines:
+                if any(n <= instruments and d <= days for n, d in over_budget[engine]):
+                    print(f"{engine:<10} {instruments:>6} x {days:<5} skipped (over budget)")
+                    continue
+
+                result = run_case(engine, case, args.repeat)
+                results.append({"engine": engine, "instruments": instruments, "days": days, **result})
+                print(
+                    f"{engine:<10} {instruments:>6} x {days:<5} "
+                    f"{result['seconds'] * 1000:>10.1f} ms  peak {result['peak_mb']:>8.1f} MB"
+                )
+                if result["seconds"] > args.budget:
+                    over_budget[engine].append((instruments, days))
+
+    sha = _git_sha()
+    out = args.out or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{sha}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({
+            "meta": {
+                "commit": sha,
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "machine": platform.machine(),
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"saved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,4 +6,49 @@ load_dotenv()
 API_KEY = os.getenv("KITE_API_KEY")
 API_SECRET = os.getenv("KITE_API_SECRET")
 REDIRECT_URL = os.getenv("REDIRECT_URL")
-FRONTEND_URL = os.getenv("FRONTEND_URL")
\ No newline at end of file
+FRONTEND_URL = os.getenv("FRONTEND_URL")
+
+# Kite allows ~3 historical requests per second per API key
+KITE_HISTORICAL_RATE = float(os.getenv("KITE_HISTORICAL_RATE", "3"))
+KITE_HISTORICAL_WORKERS = int(os.getenv("KITE_HISTORICAL_WORKERS", "8"))
+
+HOLDINGS_TTL_SECONDS = float(os.getenv("HOLDINGS_TTL_SECONDS", "30"))
+
+# Per-account sessions: HTTP connections kept per client, accounts computed at once
+KITE_POOL_SIZE = int(os.getenv("KITE_POOL_SIZE", str(KITE_HISTORICAL_WORKERS)))
+ACCOUNT_WORKERS = int(os.getenv("ACCOUNT_WORKERS", "8"))
+
+# "kite" talks to Zerodha; "sim" serves fixtures from core/sim.py for offline load tests
+BROKER_BACKEND = os.getenv("BROKER_BACKEND", "kite")
+SIM_FIXTURES = os.getenv("SIM_FIXTURES")
+SIM_INSTRUMENTS = int(os.getenv("SIM_INSTRUMENTS", "150"))
+SIM_DAYS = int(os.getenv("SIM_DAYS", "400"))
+SIM_SEED = int(os.getenv("SIM_SEED", "0"))
+SIM_LATENCY_MS = float(os.getenv("SIM_LATENCY_MS", "0"))
+SIM_JITTER_MS = float(os.getenv("SIM_JITTER_MS", "0"))
+SIM_RATE_LIMIT_RPS = float(os.getenv("SIM_RATE_LIMIT_RPS", "0"))
+SIM_THROTTLE_RATE = float(os.getenv("SIM_THROTTLE_RATE", "0"))
+SIM_FAILURE_RATE = float(os.getenv("SIM_FAILURE_RATE", "0"))
+# Extra sim accounts registered at startup, each holding a different slice of the market
+SIM_ACCOUNTS = int(os.getenv("SIM_ACCOUNTS", "0"))
+
+# Live streaming: "kite" uses the websocket ticker, "replay" random-walks prices locally
+TICK_SOURCE = os.getenv("TICK_SOURCE", "replay" if BROKER_BACKEND == "sim" else "kite")
+REPLAY_TICK_RATE = float(os.getenv("REPLAY_TICK_RATE", "200"))
+LIVE_FLUSH_MS = float(os.getenv("LIVE_FLUSH_MS", "250"))
+LIVE_REFRESH_SECONDS = float(os.getenv("LIVE_REFRESH_SECONDS", "300"))
+
+# Fragility correlation matrices; evicted entries spill to FRAGILITY_CACHE_DIR when set
+FRAGILITY_CACHE_MB = float(os.getenv("FRAGILITY_CACHE_MB", "256"))
+FRAGILITY_CACHE_DIR = os.getenv("FRAGILITY_CACHE_DIR")
+FRAGILITY_CACHE_DISK_MB = float(os.getenv("FRAGILITY_CACHE_DISK_MB", "2048"))
+
+# Analytics responses are served from cache outside market hours and revalidated in the background
+MARKET_TIMEZONE = os.getenv("MARKET_TIMEZONE", "Asia/Kolkata")
+MARKET_OPEN = os.getenv("MARKET_OPEN", "09:15")
+MARKET_CLOSE = os.getenv("MARKET_CLOSE", "15:30")
+RESULT_REVALIDATE_SECONDS = float(os.getenv("RESULT_REVALIDATE_SECONDS", "30"))
+
+# Compute engines run in a pool of worker processes; per-endpoint limits as "endpoint=n,…"
+COMPUTE_PROCESSES = int(os.getenv("COMPUTE_PROCESSES", "2"))
+COMPUTE_LIMITS = os.getenv("COMPUTE_LIMITS", "fragility/timeseries=1,exit/backtest=1")
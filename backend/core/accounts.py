@@ -0,0 +1,68 @@
+"""
+Registry of authenticated broker sessions, one per account.
+
+Each session owns its client (and so its own pooled HTTP connections, see
+core.kite.create_session_client) and a holdings snapshot cached and
+coalesced like the default session's in core.holdings. Access tokens are
+kept in memory only; Kite expires them daily and they are re-registered
+through the login callback or POST /api/accounts.
+
+The default session in core.kite is untouched, so single-account routes
+keep working; a login through /api/auth also registers that account here.
+"""
+
+import threading
+import time
+
+import config
+from core.holdings import HoldingsSnapshot
+from core.kite import create_session_client
+
+
+class Session:
+    def __init__(self, account_id: str, client):
+        self.account_id = account_id
+        self.client = client
+        self.holdings = HoldingsSnapshot(client.holdings)
+        self.registered_at = time.time()
+
+    def describe(self) -> dict:
+        return {"account_id": self.account_id, "registered_at": self.registered_at}
+
+
+_lock = threading.Lock()
+_sessions = {}  # {account_id: Session}, in registration order
+
+
+def register(account_id: str, access_token: str) -> Session:
+    """Add or replace the session for `account_id`."""
+    if not account_id or not access_token:
+        raise ValueError("account_id and access_token are required")
+
+    session = Session(account_id, create_session_client(account_id, access_token))
+    with _lock:
+        _sessions.pop(account_id, None)
+        _sessions[account_id] = session
+    return session
+
+
+def remove(account_id: str) -> bool:
+    with _lock:
+        return _sessions.pop(account_id, None) is not None
+
+
+def get_sessions(account_ids: list[str] | None = None) -> list[Session]:
+    """Sessions for `account_ids` in the order given (all of them by default); KeyError for unknown ids."""
+    with _lock:
+        if account_ids is None:
+            return list(_sessions.values())
+        missing = [a for a in account_ids if a not in _sessions]
+        if missing:
+            raise KeyError(f"Unknown account(s): {', '.join(missing)}")
+        return [_sessions[a] for a in account_ids]
+
+
+# Stand-in accounts on the simulated market
+if config.BROKER_BACKEND == "sim":
+    for i in range(1, config.SIM_ACCOUNTS + 1):
+        register(f"SIM{i:02d}", "sim")
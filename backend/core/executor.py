@@ -0,0 +1,171 @@
+"""
+Process pool for the compute engines.
+
+Routes fetch holdings and history on worker threads and hand the pandas /
+NumPy work to COMPUTE_PROCESSES worker processes, so a heavy request never
+holds the server's GIL. The price panel's closes travel through a
+shared-memory block that the worker maps read-only; only its name, shape
+and the small token and date arrays are pickled. Everything else passed to
+a job (holdings frame, settings) is pickled as usual.
+
+Each endpoint has its own limit on jobs in flight (COMPUTE_LIMITS, default
+COMPUTE_PROCESSES); callers beyond it wait their turn on the event loop.
+stats() reports how many jobs are running and queued per endpoint.
+
+Jobs must be module-level functions the worker can import. Caches the
+engines keep in module state (the fragility matrix cache)
+live once per worker process, so each endpoint prefers the same worker
+while it is free, and broadcast() reaches every worker's copy.
+"""
+
+import asyncio
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import config
+from core.panel import PricePanel
+
+
+def _parse_limits(spec: str) -> dict[str, int]:
+    limits = {}
+    for part in spec.split(","):
+        if part.strip():
+            name, _, limit = part.partition("=")
+            limits[name.strip()] = max(1, int(limit))
+    return limits
+
+
+_LIMITS = _parse_limits(config.COMPUTE_LIMITS)
+
+_workers = None  # [_Worker], started on first use
+_endpoints = {}  # {endpoint: _Endpoint}
+
+
+class _Worker:
+    def __init__(self):
+        # spawn: forking a process with live threads and sockets is unsafe
+        self.pool = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn"))
+        self.pending = 0
+
+
+class _Endpoint:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.running = 0
+        self.queued = 0
+        self._semaphore = None  # created on the serving event loop
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+
+def _get_workers() -> list[_Worker]:
+    global _workers
+    if _workers is None:
+        _workers = [_Worker() for _ in range(config.COMPUTE_PROCESSES)]
+    return _workers
+
+
+def _pick(endpoint: str) -> int:
+    """The endpoint's own worker when it is idle, else the least busy one."""
+    workers = _get_workers()
+    home = zlib.crc32(endpoint.encode()) % len(workers)
+    order = workers[home:] + workers[:home]
+    best = min(range(len(order)), key=lambda i: order[i].pending)
+    return (home + best) % len(workers)
+
+
+def _share(panel: PricePanel) -> tuple[shared_memory.SharedMemory, tuple]:
+    block = shared_memory.SharedMemory(create=True, size=max(panel.close.nbytes, 1))
+    close = np.ndarray(panel.close.shape, dtype=panel.close.dtype, buffer=block.buf)
+    close[...] = panel.close
+    handle = (block.name, panel.close.shape, panel.close.dtype.str, panel.tokens, panel.dates)
+    return block, handle
+
+
+def _run_job(job, handle: tuple | None, args: tuple):
+    """Worker side: map the shared panel (if any) and call `job(*args, panel)`."""
+    if handle is None:
+        return job(*args)
+
+    name, shape, dtype, tokens, dates = handle
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        close = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        close.flags.writeable = False
+        panel = PricePanel(tokens=tokens, dates=dates, close=close)
+        return job(*args, panel)
+    finally:
+        panel = close = None
+        try:
+            block.close()
+        except BufferError:
+            # A traceback still references the panel; the mapping goes when it is collected
+            pass
+
+
+async def _submit(index: int, job, handle: tuple | None, args: tuple):
+    worker = _workers[index]
+    worker.pending += 1
+    try:
+        return await asyncio.wrap_future(worker.pool.submit(_run_job, job, handle, args))
+    except BrokenProcessPool:
+        # The process died (e.g. out of memory); the next job gets a fresh one
+        if _workers[index] is worker:
+            _workers[index] = _Worker()
+        raise
+    finally:
+        worker.pending -= 1
+
+
+async def run(endpoint: str, job, *args, panel: PricePanel | None = None):
+    """
+    Run `job(*args)` in a worker, or `job(*args, panel)` with `panel` mapped
+    from shared memory, once `endpoint` is under its limit.
+    """
+    state = _endpoints.get(endpoint)
+    if state is None:
+        state = _endpoints[endpoint] = _Endpoint(_LIMITS.get(endpoint, config.COMPUTE_PROCESSES))
+
+    state.queued += 1
+    try:
+        await state.semaphore.acquire()
+    finally:
+        state.queued -= 1
+
+    state.running += 1
+    block, handle = _share(panel) if panel is not None else (None, None)
+    try:
+        return await _submit(_pick(endpoint), job, handle, args)
+    finally:
+        if block is not None:
+            block.close()
+            block.unlink()
+        state.running -= 1
+        state.semaphore.release()
+
+
+async def broadcast(job, *args) -> list:
+    """`job(*args)` once in every started worker, e.g. to read or reset their caches."""
+    if _workers is None:
+        return []
+    return await asyncio.gather(*(_submit(i, job, None, args) for i in range(len(_workers))))
+
+
+def stats() -> dict:
+    return {
+        "processes": config.COMPUTE_PROCESSES,
+        "pending": [w.pending for w in _workers] if _workers else [],
+        "endpoints": {
+            name: {"limit": s.limit, "running": s.running, "queued": s.queued}
+            for name, s in sorted(_endpoints.items())
+        },
+    }
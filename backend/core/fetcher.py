@@ -0,0 +1,113 @@
+"""
+Rate-limited concurrent fetcher for Kite historical candles.
+
+Requests are spread over a thread pool and gated by a shared token bucket so
+the combined call rate stays under Kite's per-second historical limit.
+Rate-limit responses (HTTP 429) are retried with exponential backoff; any other
+failure is reported per token instead of being swallowed.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+from config import KITE_HISTORICAL_RATE, KITE_HISTORICAL_WORKERS
+
+log = logging.getLogger(__name__)
+
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 0.5
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_bucket = TokenBucket(KITE_HISTORICAL_RATE)
+
+
+def _is_rate_limited(exc: Exception) -> bool:
+    return getattr(exc, "code", None) == 429 or "too many requests" in str(exc).lower()
+
+
+def _fetch_one(kite, token: int, from_date: date, to_date: date, bucket: TokenBucket) -> list[dict]:
+    for attempt in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            return kite.historical_data(
+                instrument_token=token,
+                from_date=from_date,
+                to_date=to_date,
+                interval="day",
+            )
+        except Exception as e:
+            if not _is_rate_limited(e) or attempt == MAX_RETRIES:
+                raise
+            time.sleep(BACKOFF_SECONDS * (2 ** attempt))
+    return []
+
+
+def fetch_historical(
+    kite,
+    ranges: dict[int, tuple[date, date]],
+    bucket: TokenBucket | None = None,
+    max_workers: int = KITE_HISTORICAL_WORKERS,
+    on_result=None,
+) -> tuple[dict[int, list[dict]], dict[int, str]]:
+    """
+    Fetch daily candles concurrently.
+
+    Parameters
+    ----------
+    ranges : {instrument_token: (from_date, to_date)}
+    on_result : optional callback(token, records, error) run on the calling
+        thread as each token completes, in completion order
+
+    Returns
+    -------
+    (records, errors) where records is {token: [candle, …]} and errors is
+    {token: error message} for every token that could not be fetched.
+    """
+    bucket = bucket or _bucket
+    records = {}
+    errors = {}
+    if not ranges:
+        return records, errors
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(ranges)))) as pool:
+        futures = {
+            pool.submit(_fetch_one, kite, token, from_date, to_date, bucket): token
+            for token, (from_date, to_date) in ranges.items()
+        }
+        for future in as_completed(futures):
+            token = futures[future]
+            try:
+                records[token] = future.result() or []
+            except Exception as e:
+                errors[token] = str(e) or type(e).__name__
+                log.warning("historical fetch failed for %s: %s", token, errors[token])
+            if on_result is not None:
+                on_result(token, records.get(token), errors.get(token))
+
+    return records, errors
@@ -0,0 +1,319 @@
+"""
+Local OHLC history store.
+
+Daily candles are persisted in SQLite keyed by instrument_token. Each sync only
+asks Kite for the tail that is missing since the last stored bar, instead of
+refetching a full year per token on every request.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from core.fetcher import fetch_historical
+from core.kite import get_kite
+from core.panel import PricePanel
+
+DB = "history.db"
+
+LOOKBACK_DAYS = 365
+REFRESH_SECONDS = 15 * 60  # re-pull the latest (possibly partial) bar at most this often
+RETRY_SECONDS = 60  # how soon a token whose last fetch failed is tried again
+PROGRESS_SECONDS = 0.25  # how often sync_history commits and reports tokens when asked to
+
+_lock = threading.Lock()  # guards sync_state and _fetching; never held across a fetch
+_fetching = {}  # {instrument_token: threading.Event set once the sync fetching it has written it}
+
+
+def _connect():
+    conn = sqlite3.connect(DB)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS candles ("
+        "instrument_token INTEGER, date TEXT, open REAL, high REAL, low REAL, close REAL, volume INTEGER, "
+        "PRIMARY KEY (instrument_token, date))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sync_state ("
+        "instrument_token INTEGER PRIMARY KEY, last_date TEXT, synced_at REAL, revision INTEGER DEFAULT 0, error TEXT)"
+    )
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(sync_state)")}
+    if "revision" not in columns:
+        conn.execute("ALTER TABLE sync_state ADD COLUMN revision INTEGER DEFAULT 0")
+    if "error" not in columns:
+        conn.execute("ALTER TABLE sync_state ADD COLUMN error TEXT")
+    # Left by the removed rolling exit-feature and correlation states; a full recompute is faster
+    for table in ("exit_feature_state", "fragility_corr_state", "fragility_pair_state"):
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    return conn
+
+
+def _store(conn, token: int, records: list[dict]):
+    rows = [
+        (
+            token,
+            pd.Timestamp(r["date"]).date().isoformat(),
+            r.get("open"),
+            r.get("high"),
+            r.get("low"),
+            r.get("close"),
+            r.get("volume"),
+        )
+        for r in records
+    ]
+    conn.executemany(
+        "INSERT INTO candles (instrument_token, date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(instrument_token, date) DO UPDATE SET "
+        "open = excluded.open, high = excluded.high, low = excluded.low, "
+        "close = excluded.close, volume = excluded.volume",
+        rows,
+    )
+
+
+def sync_history(instrument_tokens: list[int], kite=None, on_synced=None) -> dict[int, str]:
+    """
+    Bring the store up to date for the given tokens.
+    Only the missing tail (from the last stored bar through today) is fetched;
+    tokens synced within REFRESH_SECONDS are skipped entirely, and tokens
+    whose last fetch failed within RETRY_SECONDS.
+    Returns {instrument_token: error message} for tokens that failed to fetch
+    in this call; the error is also kept in the store until the token's next
+    successful fetch, so get_errors() reports it to later callers whose sync
+    skipped the token.
+    Candles are fetched with `kite` (the default session when omitted); they
+    are market data, so one store serves every account.
+
+    A token's revision is bumped whenever bars before its last stored date are
+    (re)written — a full backfill or an adjusted past bar — so caches derived
+    from the candles know to rebuild rather than roll forward.
+
+    `on_synced(tokens)`, when given, is called with tokens whose candles are
+    committed and readable: first the ones that needed no fetch, then the
+    fetched and failed ones every PROGRESS_SECONDS as they complete.
+
+    Concurrent syncs only serialise on reading and writing sync_state. A token
+    another sync is already fetching is not fetched again: this call waits
+    for that sync to write it before returning.
+    """
+    if not instrument_tokens:
+        return {}
+
+    kite = kite or get_kite()
+    to_date = date.today()
+    floor = to_date - timedelta(days=LOOKBACK_DAYS)
+    now = time.time()
+
+    with _lock:
+        conn = _connect()
+        state = {
+            token: (last_date, synced_at, error)
+            for token, last_date, synced_at, error in conn.execute(
+                "SELECT instrument_token, last_date, synced_at, error FROM sync_state"
+            )
+        }
+        previous = {token: last_date for token, (last_date, _, _) in state.items()}
+
+        ranges = {}
+        current = []
+        waiting = {}  # {token: event of the sync already fetching it}
+        claimed = {}  # {token: our event, set once its result is written}
+        for token in dict.fromkeys(int(t) for t in instrument_tokens):
+            if token in _fetching:
+                waiting[token] = _fetching[token]
+                continue
+
+            last_date, synced_at, error = state.get(token, (None, None, None))
+            if synced_at is not None and now - synced_at < (REFRESH_SECONDS if error is None else RETRY_SECONDS):
+                current.append(token)
+                continue
+
+            # Refetch the last stored bar too, it may have been a partial intraday candle
+            from_date = max(date.fromisoformat(last_date), floor) if last_date else floor
+            ranges[token] = (from_date, to_date)
+            claimed[token] = _fetching[token] = threading.Event()
+
+    if on_synced is not None and current:
+        on_synced(current)
+
+    pending = []
+    reported_at = time.monotonic()
+
+    def flush():
+        with _lock:
+            for token, records, error in pending:
+                if error is None:
+                    last_date = previous.get(token)
+                    rewritten = 0
+                    if records:
+                        dates = [pd.Timestamp(r["date"]).date().isoformat() for r in records]
+                        rewritten = int(last_date is None or min(dates) < last_date)
+                        _store(conn, token, records)
+                        last_date = max(dates)
+
+                    conn.execute(
+                        "INSERT INTO sync_state (instrument_token, last_date, synced_at, revision, error) VALUES (?, ?, ?, ?, NULL) "
+                        "ON CONFLICT(instrument_token) DO UPDATE SET "
+                        "last_date = excluded.last_date, synced_at = excluded.synced_at, "
+                        "revision = sync_state.revision + excluded.revision, error = NULL",
+                        (token, last_date, now, rewritten),
+                    )
+                else:
+                    # Failed tokens wait out RETRY_SECONDS instead of being retried on every request
+                    conn.execute(
+                        "INSERT INTO sync_state (instrument_token, last_date, synced_at, error) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(instrument_token) DO UPDATE SET synced_at = excluded.synced_at, error = excluded.error",
+                        (token, previous.get(token), now, error),
+                    )
+            conn.commit()
+            for token, _, _ in pending:
+                del _fetching[token]
+                claimed.pop(token).set()
+
+        if on_synced is not None:
+            on_synced([token for token, _, _ in pending])
+        pending.clear()
+
+    def record(token, records, error):
+        nonlocal reported_at
+        pending.append((token, records, error))
+        if time.monotonic() - reported_at >= PROGRESS_SECONDS:
+            flush()
+            reported_at = time.monotonic()
+
+    try:
+        _, errors = fetch_historical(kite, ranges, on_result=record)
+        if pending:
+            flush()
+
+        with _lock:
+            # Drop bars that have aged out of the lookback window
+            conn.execute("DELETE FROM candles WHERE date < ?", (floor.isoformat(),))
+            conn.commit()
+    finally:
+        conn.close()
+        if claimed:
+            # The fetch raised before these were written; let their waiters go on
+            with _lock:
+                for token, event in claimed.items():
+                    del _fetching[token]
+                    event.set()
+
+    # Tokens another sync was fetching: done once it has written them
+    for event in waiting.values():
+        event.wait()
+    if on_synced is not None and waiting:
+        on_synced(list(waiting))
+
+    return errors
+
+
+def invalidate_history(instrument_tokens: list[int]):
+    """
+    Forget stored candles for the given tokens (e.g. after a split or bonus
+    adjusts past prices); the next sync refetches the full lookback window.
+    """
+    with _lock:
+        conn = _connect()
+        for token in instrument_tokens:
+            token = int(token)
+            conn.execute("DELETE FROM candles WHERE instrument_token = ?", (token,))
+            conn.execute(
+                "UPDATE sync_state SET last_date = NULL, synced_at = NULL, revision = revision + 1 "
+                "WHERE instrument_token = ?",
+                (token,),
+            )
+        conn.commit()
+        conn.close()
+
+
+def get_revisions(instrument_tokens: list[int]) -> dict[int, int]:
+    """{instrument_token: revision} for tokens the store knows about."""
+    if not instrument_tokens:
+        return {}
+
+    tokens = [int(t) for t in instrument_tokens]
+    placeholders = ",".join("?" * len(tokens))
+    conn = _connect()
+    rows = conn.execute(
+        f"SELECT instrument_token, revision FROM sync_state WHERE instrument_token IN ({placeholders})",
+        tokens,
+    ).fetchall()
+    conn.close()
+    return {token: revision or 0 for token, revision in rows}
+
+
+def get_errors(instrument_tokens: list[int]) -> dict[int, str]:
+    """{instrument_token: error message} for the given tokens whose last fetch failed."""
+    if not instrument_tokens:
+        return {}
+
+    tokens = [int(t) for t in instrument_tokens]
+    placeholders = ",".join("?" * len(tokens))
+    conn = _connect()
+    rows = conn.execute(
+        f"SELECT instrument_token, error FROM sync_state WHERE instrument_token IN ({placeholders}) AND error IS NOT NULL",
+        tokens,
+    ).fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def failed_symbols(df: pd.DataFrame, errors: dict[int, str]) -> list[str]:
+    """Sorted trading symbols of the holdings in `df` whose tokens are in `errors`."""
+    if not errors or df.empty:
+        return []
+    return sorted(set(df.loc[df["instrument_token"].isin(list(errors)), "tradingsymbol"]))
+
+
+def get_stamp(instrument_tokens: list[int]) -> tuple:
+    """
+    (latest stored bar date, latest sync time, total revision) over the given
+    tokens: changes whenever a sync adds a bar, re-pulls today's partial one
+    or rewrites history, so results derived from the candles can key on it.
+    """
+    if not instrument_tokens:
+        return (None, None, 0)
+
+    tokens = [int(t) for t in instrument_tokens]
+    placeholders = ",".join("?" * len(tokens))
+    conn = _connect()
+    row = conn.execute(
+        f"SELECT MAX(last_date), MAX(synced_at), TOTAL(revision) FROM sync_state WHERE instrument_token IN ({placeholders})",
+        tokens,
+    ).fetchone()
+    conn.close()
+    return row[0], row[1], int(row[2])
+
+
+def load_panel(instrument_tokens: list[int], dtype=np.float64) -> PricePanel:
+    """Read stored closes for the given tokens within the lookback window into a PricePanel."""
+    if not instrument_tokens:
+        return PricePanel.empty(dtype)
+
+    tokens = [int(t) for t in instrument_tokens]
+    floor = (date.today() - timedelta(days=LOOKBACK_DAYS)).isoformat()
+    placeholders = ",".join("?" * len(tokens))
+
+    conn = _connect()
+    frame = pd.read_sql_query(
+        "SELECT instrument_token, date, close FROM candles "
+        f"WHERE instrument_token IN ({placeholders}) AND date >= ? AND close IS NOT NULL",
+        conn,
+        params=[*tokens, floor],
+    )
+    conn.close()
+
+    return PricePanel.from_long(frame, dtype=dtype)
+
+
+def get_panel(instrument_tokens: list[int], dtype=np.float64, kite=None) -> tuple[PricePanel, dict[int, str]]:
+    """
+    Sync the missing tail for each token and return the aligned close panel
+    plus {instrument_token: error} for tokens whose last fetch failed. Their
+    rows hold whatever was stored before, so callers should say so.
+    """
+    sync_history(instrument_tokens, kite)
+    return load_panel(instrument_tokens, dtype=dtype), get_errors(instrument_tokens)
@@ -0,0 +1,92 @@
+"""
+Shared holdings snapshot cache.
+
+Every feature reads holdings through here so a dashboard load costs a single
+`kite.holdings()` round trip. Snapshots live for HOLDINGS_TTL_SECONDS and
+concurrent misses are coalesced: one caller fetches, the rest wait for it.
+Each account in core.accounts keeps its own HoldingsSnapshot; the module
+functions serve the default session.
+"""
+
+import threading
+import time
+
+import pandas as pd
+
+from config import HOLDINGS_TTL_SECONDS
+from core.kite import get_kite
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class HoldingsSnapshot:
+    """
+    TTL-cached, coalesced holdings for one client. `fetch` returns the raw
+    holdings list (e.g. a KiteConnect client's bound `holdings`).
+    """
+
+    def __init__(self, fetch):
+        self._fetch_holdings = fetch
+        self._lock = threading.Lock()
+        self._snapshot = None  # (fetched_at, DataFrame)
+        self._inflight = None
+        self._generation = 0
+
+    def get(self, max_age: float = HOLDINGS_TTL_SECONDS) -> pd.DataFrame:
+        """Return a copy of the cached holdings, refreshing when older than `max_age`."""
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._snapshot[0] < max_age:
+                return self._snapshot[1].copy()
+
+            flight = self._inflight
+            leader = flight is None
+            if leader:
+                flight = self._inflight = _Flight()
+                generation = self._generation
+
+        if leader:
+            self._fetch(flight, generation)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result.copy()
+
+    def _fetch(self, flight: _Flight, generation: int):
+        try:
+            flight.result = pd.DataFrame(self._fetch_holdings())
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                # Don't publish a snapshot that was invalidated while it was in flight
+                if flight.error is None and generation == self._generation:
+                    self._snapshot = (time.monotonic(), flight.result)
+                self._inflight = None
+            flight.done.set()
+
+    def invalidate(self):
+        """Drop the cached snapshot so the next read goes upstream."""
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+
+
+# The default session's holdings, looked up through get_kite() on every fetch
+_default = HoldingsSnapshot(lambda: get_kite().holdings())
+
+
+def get_holdings(max_age: float = HOLDINGS_TTL_SECONDS) -> pd.DataFrame:
+    """Return a copy of the cached holdings, refreshing from Kite when older than `max_age`."""
+    return _default.get(max_age)
+
+
+def invalidate():
+    """Drop the cached snapshot so the next read goes upstream."""
+    _default.invalidate()
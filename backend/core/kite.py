@@ -1,7 +1,31 @@
-from kiteconnect import KiteConnect
-from config import API_KEY
+import config
 
-kite = KiteConnect(api_key=API_KEY)
+# Passed to the requests HTTPAdapter of every Kite client
+_POOL = {"pool_connections": config.KITE_POOL_SIZE, "pool_maxsize": config.KITE_POOL_SIZE}
+
+
+def _create_client():
+    if config.BROKER_BACKEND == "sim":
+        from core.sim import SimKite
+
+        return SimKite(
+            fixtures=config.SIM_FIXTURES,
+            instruments=config.SIM_INSTRUMENTS,
+            days=config.SIM_DAYS,
+            seed=config.SIM_SEED,
+            latency_ms=config.SIM_LATENCY_MS,
+            jitter_ms=config.SIM_JITTER_MS,
+            rate_limit_rps=config.SIM_RATE_LIMIT_RPS,
+            throttle_rate=config.SIM_THROTTLE_RATE,
+            failure_rate=config.SIM_FAILURE_RATE,
+        )
+
+    from kiteconnect import KiteConnect
+
+    return KiteConnect(api_key=config.API_KEY, pool=_POOL)
+
+
+kite = _create_client()
 
 _access_token = None
 
@@ -19,4 +43,19 @@ def is_authenticated():
 def get_kite():
     if not _access_token:
         raise Exception("Not authenticated")
-    return kite
\ No newline at end of file
+    return kite
+
+
+def create_session_client(account_id: str, access_token: str):
+    """A client with its own connection pool for one account's session (see core.accounts)."""
+    if config.BROKER_BACKEND == "sim":
+        return kite.account(account_id)
+
+    from kiteconnect import KiteConnect
+
+    return KiteConnect(api_key=config.API_KEY, access_token=access_token, pool=_POOL)
+
+
+# The stand-in needs no login round trip
+if config.BROKER_BACKEND == "sim":
+    set_access_token("sim")
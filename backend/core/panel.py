@@ -0,0 +1,113 @@
+"""
+Aligned token × trading-date price panel.
+
+Built once per snapshot from the history store and handed to every engine in
+place of a dict of per-token DataFrames. Closes are a dense 2-D array with NaN
+where a token has no bar on a date; `dates` is datetime64[D] and `index` maps
+instrument_token → row.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class PricePanel:
+    tokens: np.ndarray  # int64, shape (n,)
+    dates: np.ndarray  # datetime64[D], shape (d,), ascending
+    close: np.ndarray  # float, shape (n, d), NaN where no bar
+    index: dict = field(default_factory=dict)  # {instrument_token: row}
+
+    def __post_init__(self):
+        if not self.index:
+            object.__setattr__(self, "index", {int(t): i for i, t in enumerate(self.tokens)})
+
+    @classmethod
+    def empty(cls, dtype=np.float64) -> "PricePanel":
+        return cls(
+            tokens=np.empty(0, dtype=np.int64),
+            dates=np.empty(0, dtype="datetime64[D]"),
+            close=np.empty((0, 0), dtype=dtype),
+        )
+
+    @classmethod
+    def from_long(cls, frame: pd.DataFrame, dtype=np.float64) -> "PricePanel":
+        """Build from long-format rows (instrument_token, date, close)."""
+        if frame.empty:
+            return cls.empty(dtype)
+
+        token_codes, tokens = pd.factorize(frame["instrument_token"].to_numpy(dtype=np.int64), sort=True)
+        day = pd.to_datetime(frame["date"]).to_numpy().astype("datetime64[D]")
+        date_codes, dates = pd.factorize(day, sort=True)
+
+        close = np.full((len(tokens), len(dates)), np.nan, dtype=dtype)
+        close[token_codes, date_codes] = frame["close"].to_numpy(dtype=dtype)
+        return cls(tokens=np.asarray(tokens, dtype=np.int64), dates=np.asarray(dates, dtype="datetime64[D]"), close=close)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __contains__(self, token):
+        return int(token) in self.index
+
+    @property
+    def last_date(self):
+        return self.dates[-1] if len(self.dates) else None
+
+    def row(self, token) -> np.ndarray | None:
+        """Full aligned close row for `token` (NaN on missing dates), or None."""
+        i = self.index.get(int(token))
+        return None if i is None else self.close[i]
+
+    def closes(self, token) -> np.ndarray:
+        """The token's own closes in date order, gaps dropped."""
+        row = self.row(token)
+        if row is None:
+            return np.empty(0, dtype=self.close.dtype)
+        return row[~np.isnan(row)]
+
+    def rows_for(self, tokens) -> np.ndarray:
+        """Row index for each token, -1 where the token is not in the panel."""
+        return np.array([self.index.get(int(t), -1) for t in tokens], dtype=np.int64)
+
+    def packed(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Closes for `rows` with each row's gaps squeezed out and its bars
+        right-aligned (NaN-padded on the left), plus the number of bars per row.
+        Rows of -1 come back empty. Column -k is then every token's k-th latest bar.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.full((len(rows), self.close.shape[1]), np.nan, dtype=self.close.dtype)
+        present = rows >= 0
+        out[present] = self.close[rows[present]]
+
+        valid = ~np.isnan(out)
+        # Only rows with a bar followed by a gap need reordering
+        gapped = np.flatnonzero((valid[:, :-1] & ~valid[:, 1:]).any(axis=1))
+        if gapped.size:
+            order = np.argsort(valid[gapped], axis=1, kind="stable")
+            out[gapped] = np.take_along_axis(out[gapped], order, axis=1)
+
+        return out, valid.sum(axis=1)
+
+    def save(self, path: str):
+        """Write the panel to `path` as raw .npy arrays so it can be memory-mapped back."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "tokens.npy"), self.tokens)
+        np.save(os.path.join(path, "dates.npy"), self.dates)
+        np.save(os.path.join(path, "close.npy"), self.close)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"dtype": str(self.close.dtype), "shape": list(self.close.shape)}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "PricePanel":
+        mode = "r" if mmap else None
+        return cls(
+            tokens=np.load(os.path.join(path, "tokens.npy")),
+            dates=np.load(os.path.join(path, "dates.npy")),
+            close=np.load(os.path.join(path, "close.npy"), mmap_mode=mode),
+        )
@@ -0,0 +1,45 @@
+"""
+Opt-in stage timings for the compute engines.
+
+Engines call `lap = stopwatch("exit")` and then `lap("features")` after each
+stage. Nothing is recorded unless the caller is inside `record_stages()`, so
+the hooks cost one context-variable lookup in normal requests.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from time import perf_counter
+
+_timings = contextvars.ContextVar("stage_timings", default=None)
+
+
+def _noop(name: str):
+    pass
+
+
+def stopwatch(prefix: str):
+    timings = _timings.get()
+    if timings is None:
+        return _noop
+
+    last = perf_counter()
+
+    def lap(name: str):
+        nonlocal last
+        now = perf_counter()
+        key = f"{prefix}.{name}"
+        timings[key] = timings.get(key, 0.0) + now - last
+        last = now
+
+    return lap
+
+
+@contextmanager
+def record_stages():
+    """Collect {"engine.stage": seconds} for engine calls made inside the block."""
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
@@ -0,0 +1,167 @@
+"""
+Response cache for the polled analytics endpoints.
+
+Each entry is one endpoint's serialised response plus the key it was
+computed under: the settings version and the state of the data behind it
+(a hash of the holdings snapshot and, where prices are used, the history
+store's stamp). The ETag is derived from the key alone, so a request whose
+If-None-Match matches the current key gets a 304 without the body being
+computed at all.
+
+While the market is open every request rebuilds the key (holdings are
+TTL-cached and the history sync skips recently synced tokens, so that is
+cheap) and only recomputes when it changed. Outside market hours nothing
+moves until the next session: a cached entry under the current settings
+version is served at once and its key is revalidated in a background
+task, at most once per RESULT_REVALIDATE_SECONDS per endpoint.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, time as clock
+from zoneinfo import ZoneInfo
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import config
+from core import history, holdings
+
+log = logging.getLogger(__name__)
+
+_TZ = ZoneInfo(config.MARKET_TIMEZONE)
+_OPEN = clock.fromisoformat(config.MARKET_OPEN)
+_CLOSE = clock.fromisoformat(config.MARKET_CLOSE)
+
+
+def market_open(now: datetime | None = None) -> bool:
+    """Whether `now` (default: the current time) falls in a weekday trading session."""
+    now = now or datetime.now(_TZ)
+    return now.weekday() < 5 and _OPEN <= now.time() < _CLOSE
+
+
+def _holdings_hash(df) -> str:
+    payload = json.dumps(df.to_dict("records"), sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _holdings_state() -> tuple:
+    return (_holdings_hash(holdings.get_holdings()),)
+
+
+def _market_state() -> tuple:
+    df = holdings.get_holdings()
+    tokens = df["instrument_token"].dropna().unique().tolist() if not df.empty else []
+    # Fetch errors stay in the store for the engines' own get_panel() to report
+    history.sync_history(tokens)
+    return (_holdings_hash(df), *history.get_stamp(tokens))
+
+
+async def holdings_state() -> tuple:
+    """Key for results that only read holdings: a hash of the current snapshot."""
+    return await asyncio.to_thread(_holdings_state)
+
+
+async def market_state() -> tuple:
+    """Key for results that also read prices: the holdings hash plus the held tokens' history stamp."""
+    return await asyncio.to_thread(_market_state)
+
+
+def _etag(name: str, key: tuple) -> str:
+    return '"' + hashlib.blake2b(repr((name, key)).encode(), digest_size=16).hexdigest() + '"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+class _Entry:
+    def __init__(self, version, key: tuple, etag: str, body: bytes):
+        self.version = version
+        self.key = key
+        self.etag = etag
+        self.body = body
+
+
+class ResultCache:
+    """Used from the server's event loop only."""
+
+    def __init__(self):
+        self._entries = {}  # {name: _Entry}
+        self._computing = {}  # {name: asyncio.Lock}, one computation per endpoint at a time
+        self._tasks = {}  # {name: background revalidation task}
+        self._checked = {}  # {name: monotonic time of the last background revalidation}
+
+    async def respond(self, request: Request, name: str, version, state, compute) -> Response:
+        """
+        Serve endpoint `name`. `version` is its settings version, `await
+        state()` returns the key of the data it reads and `await compute()`
+        builds the response content.
+        """
+        entry = self._entries.get(name)
+        if entry is not None and entry.version == version and not market_open():
+            self._revalidate_later(name, version, state, compute)
+            return self._response(request, entry, "stale")
+
+        key = (version, *await state())
+        etag = _etag(name, key)
+        if _matches(request, etag):
+            return self._not_modified(etag, "hit")
+        entry, status = await self._current(name, version, key, etag, compute)
+        return self._response(request, entry, status)
+
+    async def _current(self, name: str, version, key: tuple, etag: str, compute) -> tuple[_Entry, str]:
+        computing = self._computing.setdefault(name, asyncio.Lock())
+        async with computing:
+            entry = self._entries.get(name)
+            if entry is not None and entry.key == key:
+                return entry, "hit"
+
+            content = await compute()
+            body = await asyncio.to_thread(lambda: JSONResponse(jsonable_encoder(content)).body)
+            entry = self._entries[name] = _Entry(version, key, etag, body)
+            return entry, "miss"
+
+    def _revalidate_later(self, name: str, version, state, compute):
+        now = time.monotonic()
+        if name in self._tasks or now - self._checked.get(name, -float("inf")) < config.RESULT_REVALIDATE_SECONDS:
+            return
+        self._checked[name] = now
+        self._tasks[name] = asyncio.get_running_loop().create_task(self._revalidate(name, version, state, compute))
+
+    async def _revalidate(self, name: str, version, state, compute):
+        try:
+            key = (version, *await state())
+            await self._current(name, version, key, _etag(name, key), compute)
+        except Exception:
+            log.exception("Revalidating %s failed; the cached response stays in place", name)
+        finally:
+            self._tasks.pop(name, None)
+
+    def _response(self, request: Request, entry: _Entry, status: str) -> Response:
+        if _matches(request, entry.etag):
+            return self._not_modified(entry.etag, status)
+        return Response(entry.body, media_type="application/json", headers=self._headers(entry.etag, status))
+
+    def _not_modified(self, etag: str, status: str) -> Response:
+        return Response(status_code=304, headers=self._headers(etag, status))
+
+    @staticmethod
+    def _headers(etag: str, status: str) -> dict:
+        # no-cache: browsers keep the body but revalidate it with If-None-Match on every poll
+        return {"ETag": etag, "Cache-Control": "no-cache", "X-Cache": status}
+
+    def clear(self):
+        self._entries.clear()
+        self._checked.clear()
+
+
+results = ResultCache()
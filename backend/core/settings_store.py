@@ -0,0 +1,91 @@
+"""
+Settings persisted in SQLite and served from memory.
+
+Each SettingsStore owns one row (id=1) of its table: the JSON config and a
+version that goes up on every save and reset, so caches derived from the
+settings can key on it instead of comparing configs. The version survives
+restarts (reset clears the config but keeps the row). Reads come from the
+in-memory copy; SQLite is only touched on first use and on writes, through
+one long-lived WAL-mode connection per database file shared by every store
+on it.
+"""
+
+import copy
+import json
+import sqlite3
+import threading
+
+_connections_lock = threading.Lock()
+_connections = {}  # {path: (connection, lock)}
+
+
+def _connection(path: str):
+    with _connections_lock:
+        if path not in _connections:
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            _connections[path] = (conn, threading.Lock())
+        return _connections[path]
+
+
+class SettingsStore:
+    def __init__(self, path: str, table: str, default: dict):
+        self.path = path
+        self.table = table
+        self.default = default
+        self._lock = threading.Lock()
+        self._config = None  # loaded lazily
+        self._version = 0
+
+    def _ensure_loaded(self):
+        if self._config is not None:
+            return
+        conn, lock = _connection(self.path)
+        with lock:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (id INTEGER PRIMARY KEY, config TEXT)")
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")}
+            if "version" not in columns:
+                conn.execute(f"ALTER TABLE {self.table} ADD COLUMN version INTEGER DEFAULT 0")
+            conn.commit()
+            row = conn.execute(f"SELECT config, version FROM {self.table} WHERE id=1").fetchone()
+        config, version = row if row else (None, 0)
+        self._config = json.loads(config) if config else copy.deepcopy(self.default)
+        self._version = version or 0
+
+    def snapshot(self) -> tuple[int, dict]:
+        """(version, config) as one consistent pair; the config is shared, don't mutate it."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._version, self._config
+
+    def get(self) -> dict:
+        """A private copy of the current config."""
+        return copy.deepcopy(self.snapshot()[1])
+
+    @property
+    def version(self) -> int:
+        return self.snapshot()[0]
+
+    def _write(self, config: dict | None) -> int:
+        conn, lock = _connection(self.path)
+        with self._lock:
+            self._ensure_loaded()
+            version = self._version + 1
+            with lock:
+                conn.execute(
+                    f"INSERT INTO {self.table} (id, config, version) VALUES (1, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET config = excluded.config, version = excluded.version",
+                    (json.dumps(config) if config is not None else None, version),
+                )
+                conn.commit()
+            self._config = copy.deepcopy(config if config is not None else self.default)
+            self._version = version
+            return version
+
+    def save(self, config: dict) -> int:
+        """Store `config` and return the new version."""
+        return self._write(config)
+
+    def reset(self) -> int:
+        """Go back to the defaults and return the new version."""
+        return self._write(None)
@@ -0,0 +1,281 @@
+"""
+Local Kite stand-in for load tests and offline benchmarks.
+
+`SimKite` implements the subset of the KiteConnect client this service uses
+(holdings, historical_data and the login handshake). Data comes either from a
+recorded fixture file or is generated synthetically for any number of
+instruments and days. Latency, jitter, rate limits and failures can be
+injected to exercise the fetch path the same way the real API does.
+
+Record a fixture from a live account:
+
+    KITE_ACCESS_TOKEN=... python -m core.sim record fixtures.json
+"""
+
+import copy
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from kiteconnect.exceptions import GeneralException, NetworkException
+
+
+class SimKite:
+    def __init__(
+        self,
+        fixtures: str | None = None,
+        instruments: int = 150,
+        days: int = 400,
+        seed: int = 0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        rate_limit_rps: float = 0.0,
+        throttle_rate: float = 0.0,
+        failure_rate: float = 0.0,
+    ):
+        """
+        fixtures        : path to a recorded fixture file; synthetic data when omitted
+        instruments     : number of synthetic holdings
+        days            : trading days of synthetic history, ending today
+        latency_ms      : base delay added to every call
+        jitter_ms       : uniform random extra delay on top of latency_ms
+        rate_limit_rps  : historical calls per second before 429s are raised (0 = unlimited)
+        throttle_rate   : probability of a spurious 429 on any historical call
+        failure_rate    : probability of a 500 on any historical call
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_rps = rate_limit_rps
+        self.throttle_rate = throttle_rate
+        self.failure_rate = failure_rate
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self.calls = {"holdings": 0, "historical_data": 0, "throttled": 0, "failed": 0}
+
+        if fixtures:
+            self._holdings, self._history = _load_fixtures(fixtures)
+        else:
+            self._holdings, self._history = _synthesize(instruments, days, seed)
+
+    # Login handshake, so the auth routes work unchanged
+    def login_url(self):
+        return "/api/auth/callback?request_token=sim"
+
+    def generate_session(self, request_token, api_secret=None):
+        return {"access_token": "sim", "user_id": "SIM"}
+
+    def set_access_token(self, token):
+        pass
+
+    def account(self, account_id: str) -> "SimKite":
+        """
+        Another account on the same market: a seeded slice of the instruments
+        at its own quantities, sharing this client's history and fault settings.
+        """
+        seed = zlib.crc32(account_id.encode())
+        rng = np.random.default_rng(seed)
+        other = copy.copy(self)
+        other._random = random.Random(seed)
+        other._lock = threading.Lock()
+        other._recent = deque()
+        other.calls = dict.fromkeys(self.calls, 0)
+
+        picked = rng.random(len(self._holdings)) < 0.5
+        picked[rng.integers(len(picked))] = True
+        other._holdings = [
+            {**h, "quantity": int(q)}
+            for h, keep, q in zip(self._holdings, picked, rng.integers(1, 500, len(picked)))
+            if keep
+        ]
+        return other
+
+    # Data endpoints
+    def holdings(self):
+        self._delay()
+        with self._lock:
+            self.calls["holdings"] += 1
+        return [dict(h) for h in self._holdings]
+
+    def historical_data(self, instrument_token, from_date, to_date, interval, continuous=False, oi=False):
+        self._delay()
+        self._admit()
+
+        frame = self._history.get(int(instrument_token))
+        if frame is None:
+            raise GeneralException("invalid token", code=400)
+
+        start = pd.Timestamp(from_date).to_datetime64()
+        end = pd.Timestamp(to_date).to_datetime64() + np.timedelta64(1, "D")
+        rows = frame[(frame["date"] >= start) & (frame["date"] < end)]
+        return [
+            {
+                "date": ts.to_pydatetime(),
+                "open": float(o),
+                "high": float(h),
+                "low": float(lo),
+                "close": float(c),
+                "volume": int(v),
+            }
+            for ts, o, h, lo, c, v in zip(
+                rows["date"], rows["open"], rows["high"], rows["low"], rows["close"], rows["volume"]
+            )
+        ]
+
+    def _delay(self):
+        delay = self.latency_ms + (self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _admit(self):
+        with self._lock:
+            self.calls["historical_data"] += 1
+
+            if self.rate_limit_rps > 0:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] >= 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.rate_limit_rps:
+                    self.calls["throttled"] += 1
+                    raise NetworkException("Too many requests", code=429)
+                self._recent.append(now)
+
+            roll = self._random.random()
+            if roll < self.throttle_rate:
+                self.calls["throttled"] += 1
+                raise NetworkException("Too many requests", code=429)
+            if roll < self.throttle_rate + self.failure_rate:
+                self.calls["failed"] += 1
+                raise GeneralException("Simulated upstream failure", code=500)
+
+
+def synthetic_market(instruments: int, days: int, seed: int = 0):
+    """
+    Synthetic holdings and daily closes on a business-day calendar ending today.
+
+    Returns (holdings, dates, closes) where closes is an (instruments, days)
+    array with NaN before each instrument's listing date. Prices follow
+    one-factor-per-sector random walks so clusters and correlations look realistic.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=date.today(), periods=days)
+    sectors = max(1, instruments // 25)
+
+    market = rng.normal(0.0003, 0.009, days)
+    sector_moves = rng.normal(0, 0.008, (sectors, days))
+    sector = rng.integers(0, sectors, instruments)
+    beta = rng.uniform(0.5, 1.5, instruments)
+    idio = rng.uniform(0.005, 0.025, instruments)
+
+    returns = beta[:, None] * market[None, :] + sector_moves[sector]
+    returns += rng.standard_normal((instruments, days)) * idio[:, None]
+    closes = rng.uniform(50, 3000, instruments)[:, None] * np.exp(np.cumsum(returns, axis=1))
+    closes = np.round(closes, 2)
+
+    # Recent listings, so not every instrument covers the full range
+    recent = rng.random(instruments) < 0.05
+    first = np.where(recent, rng.integers(0, max(1, days // 2), instruments), 0)
+    closes[np.arange(days)[None, :] < first[:, None]] = np.nan
+
+    last = closes[:, -1]
+    prev = closes[:, -2] if days > 1 else last
+    quantity = rng.integers(1, 500, instruments)
+    average = np.round(last * rng.uniform(0.6, 1.4, instruments), 2)
+
+    holdings = [
+        {
+            "tradingsymbol": f"SIM{i:05d}",
+            "exchange": "NSE",
+            "instrument_token": 100000 + i,
+            "product": "CNC",
+            "quantity": int(quantity[i]),
+            "t1_quantity": 0,
+            "average_price": float(average[i]),
+            "last_price": float(last[i]),
+            "close_price": float(prev[i]),
+        }
+        for i in range(instruments)
+    ]
+    return holdings, dates, closes
+
+
+def _synthesize(instruments: int, days: int, seed: int):
+    holdings, dates, closes = synthetic_market(instruments, days, seed)
+    rng = np.random.default_rng(seed + 1)
+
+    history = {}
+    for h, row in zip(holdings, closes):
+        listed = ~np.isnan(row)
+        close = row[listed]
+        spread = np.abs(rng.normal(0, 0.01, close.size)) * close
+
+        history[h["instrument_token"]] = pd.DataFrame({
+            "date": dates[listed].to_numpy(),
+            "open": np.round(close + rng.normal(0, 0.3, close.size) * spread, 2),
+            "high": np.round(close + spread, 2),
+            "low": np.round(close - spread, 2),
+            "close": close,
+            "volume": rng.integers(1_000, 1_000_000, close.size),
+        })
+
+    return holdings, history
+
+
+def _load_fixtures(path: str):
+    with open(path) as f:
+        data = json.load(f)
+
+    history = {}
+    for token, candles in data.get("historical", {}).items():
+        frame = pd.DataFrame(candles)
+        frame["date"] = pd.to_datetime(frame["date"]).dt.tz_localize(None)
+        history[int(token)] = frame.sort_values("date").reset_index(drop=True)
+
+    return data.get("holdings", []), history
+
+
+def record_fixtures(kite, path: str, days: int = 365):
+    """Dump holdings and daily candles from a live client into a fixture file."""
+    holdings = kite.holdings()
+    to_date = date.today()
+    from_date = to_date - timedelta(days=days)
+
+    historical = {}
+    for h in holdings:
+        token = h["instrument_token"]
+        try:
+            historical[str(token)] = kite.historical_data(token, from_date, to_date, "day")
+        except Exception as e:
+            print(f"skipped {h['tradingsymbol']}: {e}", file=sys.stderr)
+        time.sleep(0.35)  # stay under the historical rate limit
+
+    def _default(value):
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        raise TypeError(type(value))
+
+    with open(path, "w") as f:
+        json.dump({"holdings": holdings, "historical": historical}, f, default=_default)
+
+
+if __name__ == "__main__":
+    import os
+
+    from kiteconnect import KiteConnect
+
+    from config import API_KEY
+
+    if len(sys.argv) != 3 or sys.argv[1] != "record":
+        sys.exit("usage: python -m core.sim record <fixtures.json>")
+
+    live = KiteConnect(api_key=API_KEY)
+    live.set_access_token(os.environ["KITE_ACCESS_TOKEN"])
+    record_fixtures(live, sys.argv[2])
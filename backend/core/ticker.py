@@ -0,0 +1,101 @@
+"""
+Live last-price feeds.
+
+A tick source delivers {instrument_token: last_price} batches to a callback
+from its own thread. KiteTickSource wraps Kite's websocket ticker in LTP mode;
+ReplayTickSource random-walks prices locally so the live pipeline can be
+exercised offline and under load.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+import config
+
+
+class KiteTickSource:
+    def __init__(self, api_key: str, access_token: str):
+        self._api_key = api_key
+        self._access_token = access_token
+        self._ws = None
+        self._tokens = []
+        self._on_ticks = None
+
+    def start(self, on_ticks):
+        from kiteconnect import KiteTicker
+
+        self._on_ticks = on_ticks
+        self._ws = KiteTicker(self._api_key, self._access_token)
+        self._ws.on_ticks = self._handle_ticks
+        self._ws.on_connect = lambda ws, response: self._send_subscription()
+        # Twisted's reactor can only be started once per process, so the
+        # connection is kept up for the life of the app once opened
+        self._ws.connect(threaded=True)
+
+    def subscribe(self, prices: dict):
+        old = set(self._tokens)
+        self._tokens = list(prices)
+        if self._ws is not None and self._ws.is_connected():
+            gone = list(old - set(self._tokens))
+            if gone:
+                self._ws.unsubscribe(gone)
+            self._send_subscription()
+
+    def _send_subscription(self):
+        if self._tokens:
+            self._ws.subscribe(self._tokens)
+            self._ws.set_mode(self._ws.MODE_LTP, self._tokens)
+
+    def _handle_ticks(self, ws, ticks):
+        self._on_ticks({t["instrument_token"]: t["last_price"] for t in ticks if "last_price" in t})
+
+
+class ReplayTickSource:
+    """Geometric random walk from the subscribed prices at `rate` ticks per second."""
+
+    INTERVAL = 0.05
+
+    def __init__(self, rate: float = 200, volatility: float = 0.001, seed: int | None = None):
+        self.rate = rate
+        self.volatility = volatility
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._tokens = np.empty(0, dtype=np.int64)
+        self._prices = np.empty(0)
+        self._thread = None
+
+    def start(self, on_ticks):
+        self._thread = threading.Thread(target=self._run, args=(on_ticks,), daemon=True)
+        self._thread.start()
+
+    def subscribe(self, prices: dict):
+        with self._lock:
+            self._tokens = np.fromiter(prices, dtype=np.int64, count=len(prices))
+            self._prices = np.array([float(p) for p in prices.values()])
+
+    def _run(self, on_ticks):
+        carry = 0.0
+        while True:
+            time.sleep(self.INTERVAL)
+            carry += self.rate * self.INTERVAL
+            count, carry = int(carry), carry - int(carry)
+            with self._lock:
+                if count == 0 or not len(self._tokens):
+                    continue
+                pick = self._rng.integers(0, len(self._tokens), count)
+                # Duplicate picks compound within a batch like consecutive ticks
+                np.multiply.at(self._prices, pick, np.exp(self._rng.normal(0, self.volatility, count)))
+                touched = np.unique(pick)
+                batch = dict(zip(self._tokens[touched].tolist(), np.round(self._prices[touched], 2).tolist()))
+            on_ticks(batch)
+
+
+def create_tick_source():
+    if config.TICK_SOURCE == "replay":
+        return ReplayTickSource(rate=config.REPLAY_TICK_RATE, seed=config.SIM_SEED)
+
+    from core.kite import get_kite
+
+    return KiteTickSource(config.API_KEY, get_kite().access_token)
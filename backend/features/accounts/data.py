@@ -0,0 +1,11 @@
+from core import accounts
+from core.history import get_panel
+from core.panel import PricePanel
+
+
+def get_sessions(account_ids: list[str] | None = None) -> list[accounts.Session]:
+    return accounts.get_sessions(account_ids)
+
+
+def get_price_panel(instrument_tokens: list[int], kite) -> tuple[PricePanel, dict[int, str]]:
+    return get_panel(instrument_tokens, kite=kite)
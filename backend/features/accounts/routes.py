@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from .service import ENGINES, add_account, get_batch, list_accounts, remove_account
+
+router = APIRouter()
+
+
+@router.get("")
+def accounts():
+    return list_accounts()
+
+
+@router.post("")
+async def register_account(request: Request):
+    body = await request.json()
+    try:
+        return add_account(body.get("account_id"), body.get("access_token"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/{account_id}")
+def unregister_account(account_id: str):
+    if not remove_account(account_id):
+        raise HTTPException(status_code=404, detail="No such account")
+    return {"status": "ok"}
+
+
+@router.get("/batch")
+async def batch(accounts: str | None = None, engines: str | None = None):
+    """Overview, exit signals and fragility per account, e.g. ?accounts=AB1234,CD5678&engines=portfolio,exit."""
+    account_ids = accounts.split(",") if accounts else None
+    selected = tuple(engines.split(",")) if engines else ENGINES
+    try:
+        return await get_batch(account_ids, selected)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
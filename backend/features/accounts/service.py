@@ -0,0 +1,128 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import ACCOUNT_WORKERS
+from core import accounts, executor, history
+from core.panel import PricePanel
+from features.exit.compute import compute_exit_signals, price_stats
+from features.exit.settings import get_settings as get_exit_settings
+from features.fragility.cache import correlation_cache
+from features.fragility.compute import compute_fragility_overview, pairwise
+from features.fragility.settings import get_settings as get_fragility_settings
+from features.portfolio.compute import compute_overview
+from features.portfolio.settings import get_compiled_settings as get_portfolio_settings
+from .data import get_price_panel, get_sessions
+
+ENGINES = ("portfolio", "exit", "fragility")
+
+
+def list_accounts():
+    return [session.describe() for session in get_sessions()]
+
+
+def add_account(account_id: str, access_token: str):
+    return accounts.register(account_id, access_token).describe()
+
+
+def remove_account(account_id: str) -> bool:
+    return accounts.remove(account_id)
+
+
+def _holdings(session: accounts.Session):
+    try:
+        return session.holdings.get(), None
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+
+def _account(df, engines: tuple[str, ...], portfolio, exit_settings: dict, stats, panel):
+    """Pool job behind get_batch(): one account's engines over the shared panel."""
+    result = {}
+    for engine in engines:
+        try:
+            if engine == "portfolio":
+                result[engine] = compute_overview(df.copy(), portfolio)
+            elif engine == "exit":
+                bars, volatility, ma50, ma200 = stats
+                account_stats = (bars.astype(np.int64), volatility, ma50, ma200)
+                result[engine] = compute_exit_signals(df.copy(), panel, account_stats, exit_settings)
+            else:
+                fragility = get_fragility_settings()
+                view = correlation_cache.view(fragility["window_days"], fragility["min_return_points"], pairwise)
+                result[engine] = compute_fragility_overview(df.copy(), panel, view.correlate, view.cluster)
+        except Exception as e:
+            result[engine] = {"error": str(e) or type(e).__name__}
+    return result
+
+
+def _union_stats(tokens: list[int], panel):
+    """Pool job behind get_batch(): exit price stats computed once over the union panel."""
+    return np.vstack(price_stats(panel, tokens))
+
+
+def _fetch(sessions: list[accounts.Session], engines: tuple[str, ...]):
+    workers = max(1, min(ACCOUNT_WORKERS, len(sessions)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        fetched = list(pool.map(_holdings, sessions))
+
+    frames = [df for df, _ in fetched if df is not None and not df.empty]
+    tokens = sorted({int(t) for df in frames for t in df["instrument_token"].dropna()})
+
+    panel, errors = PricePanel.empty(), {}
+    if tokens and ("exit" in engines or "fragility" in engines):
+        # Any authenticated session can fetch market data for the whole union
+        client = next(s.client for s, (df, _) in zip(sessions, fetched) if df is not None and not df.empty)
+        panel, errors = get_price_panel(tokens, client)
+    failed = sorted({symbol for df in frames for symbol in history.failed_symbols(df, errors)})
+    return fetched, tokens, panel, failed
+
+
+async def get_batch(account_ids: list[str] | None = None, engines: tuple[str, ...] = ENGINES):
+    """
+    Run the portfolio, exit and fragility engines for many accounts at once.
+
+    Holdings are fetched for every account concurrently, then candles for the
+    union of their instruments are synced and loaded once into a shared
+    panel (and exit price stats computed once over it). Each account's engines
+    run as one job in the compute pool against that shared snapshot, at most
+    the "accounts/batch" limit of them at a time. A failure is reported per
+    account (or per engine) instead of failing the batch, and `failed` lists
+    the symbols whose history fetch failed (scored on their stored candles).
+    """
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        raise ValueError(f"engines must be among {', '.join(ENGINES)}")
+
+    sessions = get_sessions(account_ids)
+    if not sessions:
+        return {"accounts": {}, "instruments": 0, "failed": []}
+
+    fetched, tokens, panel, failed = await asyncio.to_thread(_fetch, sessions, engines)
+    stats = None
+    if tokens and "exit" in engines:
+        stats = await executor.run("accounts/batch", _union_stats, tokens, panel=panel)
+    position = {token: i for i, token in enumerate(tokens)}
+
+    # Settings go with the jobs: a worker's own stores would keep the copies they loaded first
+    portfolio = get_portfolio_settings()
+    exit_settings = get_exit_settings()
+
+    async def run(df, error):
+        if error is not None:
+            return {"error": error}
+        try:
+            account_stats = stats[:, [position[int(t)] for t in df["instrument_token"]]] if stats is not None else None
+            return await executor.run(
+                "accounts/batch", _account, df, engines, portfolio, exit_settings, account_stats, panel=panel
+            )
+        except Exception as e:
+            return {"error": str(e) or type(e).__name__}
+
+    results = await asyncio.gather(*(run(df, error) for df, error in fetched))
+    return {
+        "accounts": {s.account_id: r for s, r in zip(sessions, results)},
+        "instruments": len(tokens),
+        "failed": failed,
+    }
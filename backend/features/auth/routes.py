@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import RedirectResponse
 
+from core import accounts
 from core.kite import kite, set_access_token, is_authenticated
 from config import API_SECRET, FRONTEND_URL
 
@@ -19,6 +20,7 @@ def callback(request_token: str):
     try:
         data = kite.generate_session(request_token, api_secret=API_SECRET)
         set_access_token(data["access_token"])
+        accounts.register(data["user_id"], data["access_token"])
 
         return RedirectResponse(f"{FRONTEND_URL}/")
 
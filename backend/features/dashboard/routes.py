@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from .service import get_dashboard
+
+router = APIRouter()
+
+
+@router.get("")
+async def dashboard(parallel: bool = True):
+    return await get_dashboard(parallel=parallel)
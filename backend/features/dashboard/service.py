@@ -0,0 +1,57 @@
+import asyncio
+
+from core import executor, history
+from core.panel import PricePanel
+from features.portfolio.compute import compute_overview
+from features.portfolio.settings import get_compiled_settings as get_portfolio_settings
+from features.exit.service import score_signals
+from features.exit.settings import get_settings as get_exit_settings
+from features.fragility.cache import correlation_cache
+from features.fragility.compute import compute_fragility_overview, pairwise
+from features.fragility.settings import get_settings as get_fragility_settings
+from .data import get_holdings, get_price_panel
+
+
+def _fragility(df, panel):
+    settings = get_fragility_settings()
+    view = correlation_cache.view(settings["window_days"], settings["min_return_points"], pairwise)
+    return compute_fragility_overview(df, panel, view.correlate, view.cluster)
+
+
+def _engines(df, portfolio, exit_settings: dict, panel):
+    """Pool job behind get_dashboard(parallel=False): the three engines one after another."""
+    # Each engine gets its own frame; compute_overview adds columns in place
+    return {
+        "portfolio": compute_overview(df.copy(), portfolio),
+        "exit": score_signals(df.copy(), exit_settings, panel),
+        "fragility": _fragility(df.copy(), panel),
+    }
+
+
+async def get_dashboard(parallel: bool = True):
+    """
+    Fetch holdings and history once and run the portfolio, exit and
+    fragility engines over the same snapshot, each in its own worker
+    process when `parallel`, else one after another in a single one.
+    """
+    df = await asyncio.to_thread(get_holdings)
+    tokens = df["instrument_token"].dropna().unique().tolist() if not df.empty else []
+    panel, errors = await asyncio.to_thread(get_price_panel, tokens) if tokens else (PricePanel.empty(), {})
+    # Settings go with the jobs: a worker's own stores would keep the copies they loaded first
+    portfolio = get_portfolio_settings()
+    exit_settings = get_exit_settings()
+
+    if not parallel:
+        result = await executor.run("dashboard", _engines, df, portfolio, exit_settings, panel=panel)
+    else:
+        # The portfolio engine reads no prices, so its job skips the shared panel
+        portfolio, exit_signals, fragility = await asyncio.gather(
+            executor.run("dashboard/portfolio", compute_overview, df, portfolio),
+            executor.run("dashboard/exit", score_signals, df, exit_settings, panel=panel),
+            executor.run("dashboard/fragility", _fragility, df, panel=panel),
+        )
+        result = {"portfolio": portfolio, "exit": exit_signals, "fragility": fragility}
+
+    # Holdings whose history fetch failed are scored on the candles stored before
+    result["failed"] = history.failed_symbols(df, errors)
+    return result
@@ -0,0 +1,190 @@
+"""
+Walk-forward exit-score history.
+
+Scores every holding on every trading day of the panel with the same KPIs as
+the live engine, as if each day were "today": a window of the trailing year
+of the token's own bars, MA50/MA200 over its last 50/200 bars, and
+portfolio-relative medians taken across the holdings present that day.
+Positions are assumed held at today's quantity and average price throughout.
+
+All windowed statistics come from cumulative sums in each token's own-bar
+coordinates, gathered at every day's bar index, so the whole (holdings × days)
+grid is computed without looping over days or holdings. Early days only see
+as much history as the panel holds.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from core.panel import PricePanel
+from .compute import ACTIONS, MIN_HISTORY_BARS, kpi_bins, score_table
+
+VOL_WINDOW_DAYS = 365
+DEFAULT_HORIZONS = (5, 20, 60)
+
+
+def _left_packed(close: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Each row's bars moved to the front in date order, and the validity mask of the original."""
+    valid = ~np.isnan(close)
+    order = np.argsort(~valid, axis=1, kind="stable")
+    return np.take_along_axis(close, order, axis=1), valid
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    """prefix[:, k] = sum of the first k columns."""
+    out = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(np.nan_to_num(values), axis=1, out=out[:, 1:])
+    return out
+
+
+def _gather(prefix: np.ndarray, index: np.ndarray) -> np.ndarray:
+    return np.take_along_axis(prefix, index, axis=1)
+
+
+def _with_gaps(values: np.ndarray, present: np.ndarray) -> list:
+    out = values.astype(object)
+    out[~present] = None
+    return out.tolist()
+
+
+def _forward_stats(level: np.ndarray, fwd: np.ndarray) -> dict:
+    stats = {}
+    for i, action in enumerate(ACTIONS.tolist()):
+        values = fwd[(level == i) & ~np.isnan(fwd)]
+        stats[action] = _bucket(values)
+    values = fwd[(level >= 0) & (level <= 1) & ~np.isnan(fwd)]
+    stats["EXIT_OR_TRIM"] = _bucket(values)
+    hold = stats["HOLD"]["mean_pct"]
+    flagged = stats["EXIT_OR_TRIM"]["mean_pct"]
+    # What the EXIT/TRIM rule saved per flagged holding-day versus just holding
+    stats["rule_edge_pct"] = (
+        round(hold - flagged, 3) if hold is not None and flagged is not None else None
+    )
+    return stats
+
+
+def _bucket(values: np.ndarray) -> dict:
+    if values.size == 0:
+        return {"count": 0, "mean_pct": None, "median_pct": None, "hit_rate": None}
+    return {
+        "count": int(values.size),
+        "mean_pct": round(float(values.mean()) * 100, 3),
+        "median_pct": round(float(np.median(values)) * 100, 3),
+        # Share of flags followed by a decline
+        "hit_rate": round(float((values < 0).mean()), 3),
+    }
+
+
+def compute_exit_backtest(
+    holdings_df: pd.DataFrame,
+    panel: PricePanel,
+    settings: dict,
+    horizons=DEFAULT_HORIZONS,
+) -> dict:
+    """
+    Returns
+    -------
+    dict with keys: dates, symbols, exit_score / action (holdings × days,
+    None before a holding has any bars), action_labels, forward_returns
+    ({horizon: per-action statistics}), settings
+    """
+    thresholds = settings.get("action_thresholds", {})
+    fn_scores = settings.get("function_scores", {})
+
+    symbols = holdings_df["tradingsymbol"].astype(str).tolist()
+    rows = panel.rows_for(holdings_df["instrument_token"].to_numpy())
+    n, days = len(rows), len(panel.dates)
+
+    close = np.full((n, days), np.nan)
+    close[rows >= 0] = panel.close[rows[rows >= 0]]
+    packed, valid = _left_packed(close)
+
+    # K[:, t] = number of own bars up to and including day t
+    K = np.cumsum(valid, axis=1)
+    present = K > 0
+    last_bar = np.maximum(K - 1, 0)
+
+    # Window start: own bars before the first day inside the trailing year
+    start = np.searchsorted(panel.dates, panel.dates - np.timedelta64(VOL_WINDOW_DAYS, "D"))
+    L = np.where(start > 0, K[:, np.maximum(start - 1, 0)], 0)
+    bars = K - L
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = packed[:, 1:] / packed[:, :-1] - 1.0
+        # rs[:, k] = sum of returns among the first k bars (k bars → k - 1 returns)
+        rs = np.concatenate([np.zeros((n, 1)), _prefix(returns)], axis=1)
+        rq = np.concatenate([np.zeros((n, 1)), _prefix(returns * returns)], axis=1)
+        lo = np.minimum(L + 1, K)
+        m = bars - 1
+        ret_sum = _gather(rs, K) - _gather(rs, lo)
+        ret_sq = _gather(rq, K) - _gather(rq, lo)
+        variance = np.maximum(ret_sq - ret_sum * ret_sum / m, 0.0) / (m - 1)
+        volatility = np.where(m > 1, np.sqrt(variance) * np.sqrt(252), 0.0)
+
+        cs = _prefix(packed)
+        total = _gather(cs, K) - _gather(cs, L)
+        full_mean = total / bars
+        ma = {}
+        for w in (50, 200):
+            tail = (_gather(cs, K) - _gather(cs, np.maximum(K - w, 0))) / w
+            ma[w] = np.where(bars >= w, tail, full_mean)
+
+    ltp = np.take_along_axis(packed, last_bar, axis=1)
+    usable = present & (bars >= MIN_HISTORY_BARS)
+    volatility = np.where(usable, volatility, 0.0)
+    ma50 = np.where(usable, ma[50], ltp)
+    ma200 = np.where(usable, ma[200], ltp)
+
+    avg_price = holdings_df["average_price"].to_numpy(dtype=float)[:, None]
+    qty = holdings_df["quantity"].to_numpy(dtype=float)[:, None]
+    value = np.where(present, ltp * qty, 0.0)
+    total_value = value.sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return_pct = np.where(avg_price != 0, (ltp - avg_price) / avg_price * 100, 0.0)
+        weight_pct = np.where(total_value > 0, value / total_value * 100, 0.0)
+        rar = np.where(volatility > 0, return_pct / volatility, 0.0)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # days before any holding has bars
+        median_vol = np.nan_to_num(np.nanmedian(np.where(present, volatility, np.nan), axis=0))
+        median_rar = np.nan_to_num(np.nanmedian(np.where(present, rar, np.nan), axis=0))
+
+    features = {
+        "ltp": ltp,
+        "return_pct": np.round(return_pct, 2),
+        "weight_pct": np.round(weight_pct, 2),
+        "volatility": np.round(volatility, 4),
+        "ma50": np.round(ma50, 2),
+        "ma200": np.round(ma200, 2),
+        "rar": np.round(rar, 4),
+        "median_vol": median_vol,
+        "median_rar": median_rar,
+    }
+    exit_score = sum(score_table(fn_scores, kpi)[b] for kpi, b in kpi_bins(features).items())
+    hit = np.stack(
+        [exit_score >= thresholds.get(k, d) for k, d in (("EXIT", 70), ("TRIM", 50), ("WATCH", 30))]
+    )
+    level = np.where(hit.any(axis=0), hit.argmax(axis=0), 3)
+    level = np.where(present, level, -1)
+
+    forward = {}
+    for h in horizons:
+        fwd = np.full((n, days), np.nan)
+        if h < days:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                fwd[:, :-h] = np.take_along_axis(packed, np.maximum(K[:, h:] - 1, 0), axis=1) / ltp[:, :-h] - 1.0
+            fwd[:, :-h][~present[:, h:] | ~present[:, :-h]] = np.nan
+        forward[str(h)] = _forward_stats(level, fwd)
+
+    return {
+        "dates": [str(d) for d in panel.dates],
+        "symbols": symbols,
+        "exit_score": _with_gaps(exit_score, present),
+        "action": _with_gaps(level, present),
+        "action_labels": ACTIONS.tolist(),
+        "forward_returns": forward,
+        "settings": {"action_thresholds": thresholds, "function_scores": fn_scores},
+    }
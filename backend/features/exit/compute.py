@@ -1,218 +1,293 @@
 """
 Exit Signals Engine — Pure computation layer.
 Scores each holding 0–100 across 5 KPIs and assigns an action.
+
+Everything is columnar: features are computed for all holdings at once from
+the aligned price panel and each KPI is a vectorised bin lookup.
 """
 
 import numpy as np
 import pandas as pd
-from .settings import get_settings
+from core.panel import PricePanel
+from core.profiling import stopwatch
+from .settings import DEFAULT, get_settings
+
+MIN_HISTORY_BARS = 10
+
+ACTIONS = np.array(["EXIT", "TRIM", "WATCH", "HOLD"])
 
 
+# Each KPI maps a holding to a bin; bin 0 scores 0 and bin k scores
+# function_scores[kpi][k - 1]. Bins depend only on the features, so any
+# number of score/threshold configurations can be applied to one binning.
+
 # KPI 1: Loss Severity
-def _score_loss_severity(return_pct: float, scores: list) -> int:
+def _bin_loss_severity(f: dict) -> np.ndarray:
     """Capital protection — penalises unrealised losses."""
-    if return_pct >= 0:
-        return 0
-    if return_pct >= -5:
-        return scores[0]         
-    if return_pct >= -10:
-        return scores[1]
-    if return_pct >= -20:
-        return scores[2]
-    return scores[3]
+    # >= 0 | [-5, 0) | [-10, -5) | [-20, -10) | < -20
+    return 4 - np.digitize(f["return_pct"], [-20, -10, -5, 0])
 
 
 # KPI 2: Risk vs Median
-def _score_risk_vs_median(volatility: float, median_vol: float, scores: list) -> int:
+def _bin_risk_vs_median(f: dict) -> np.ndarray:
     """Flags stocks riskier than the portfolio norm."""
-    if median_vol == 0:
-        return 0
-    ratio = volatility / median_vol
-    if ratio <= 1.0:
-        return 0
-    if ratio <= 1.2:
-        return scores[0]
-    if ratio <= 1.5:
-        return scores[1]
-    return scores[2]
+    median = np.asarray(f["median_vol"])  # scalar, or one median per day in the backtest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = f["volatility"] / median
+    # <= 1.0 | (1.0, 1.2] | (1.2, 1.5] | > 1.5
+    return np.where(median == 0, 0, np.digitize(ratio, [1.0, 1.2, 1.5], right=True))
 
 
 # KPI 3: Risk-Adjusted Inefficiency
-def _score_risk_adj_inefficiency(rar: float, median_rar: float, scores: list) -> int:
+def _bin_risk_adj_inefficiency(f: dict) -> np.ndarray:
     """Eliminates high-risk, low-reward positions (Sharpe-lite)."""
-    if rar >= median_rar:
-        return 0
-    if rar >= 0:
-        return scores[0]
-    if rar >= -1:          # moderately negative
-        return scores[1]
-    return scores[2]              # very negative
+    rar = f["rar"]
+    # >= median | >= 0 | >= -1 (moderately negative) | < -1 (very negative)
+    return np.where(rar >= f["median_rar"], 0, 3 - np.digitize(rar, [-1, 0]))
 
 
 # KPI 4: Trend Weakness
-def _score_trend_weakness(ltp: float, ma50: float, ma200: float, scores: list) -> int:
+def _bin_trend_weakness(f: dict) -> np.ndarray:
     """Timing confirmation via moving averages."""
-    if ltp < ma50 and ma50 < ma200:
-        return scores[1]
-    if ltp < ma50:
-        return scores[0]
-    return 0
+    below50 = f["ltp"] < f["ma50"]
+    return np.select([below50 & (f["ma50"] < f["ma200"]), below50], [2, 1], 0)
 
 
 # KPI 5: Concentration Penalty
-def _score_concentration(weight_pct: float, scores: list) -> int:
+def _bin_concentration(f: dict) -> np.ndarray:
     """Penalises over-sized positions."""
-    if weight_pct <= 5:
-        return 0
-    if weight_pct <= 8:
-        return scores[0]
-    if weight_pct <= 12:
-        return scores[1]
-    return scores[2]
+    # <= 5 | (5, 8] | (8, 12] | > 12
+    return np.digitize(f["weight_pct"], [5, 8, 12], right=True)
+
+
+KPIS = {
+    "loss_severity": _bin_loss_severity,
+    "risk_vs_median": _bin_risk_vs_median,
+    "risk_adj_inefficiency": _bin_risk_adj_inefficiency,
+    "trend_weakness": _bin_trend_weakness,
+    "concentration": _bin_concentration,
+}
+
+# What each KPI needs: the holdings alone, the holding's own price history,
+# or the portfolio medians over everyone's history
+HOLDING_KPIS = ("loss_severity", "concentration")
+HISTORY_KPIS = ("trend_weakness",)
+MEDIAN_KPIS = ("risk_vs_median", "risk_adj_inefficiency")
+
+
+def kpi_bins(features: dict) -> dict[str, np.ndarray]:
+    return {name: fn(features) for name, fn in KPIS.items()}
+
+
+def score_table(fn_scores: dict, kpi: str) -> np.ndarray:
+    return np.array([0, *fn_scores.get(kpi, DEFAULT["function_scores"][kpi])])
 
 
 #  Action mapping
-def _map_action(score: int, thresholds: dict) -> str:
-    if score >= thresholds.get("EXIT", 70):
-        return "EXIT"
-    if score >= thresholds.get("TRIM", 50):
-        return "TRIM"
-    if score >= thresholds.get("WATCH", 30):
-        return "WATCH"
-    return "HOLD"
+def _map_action(score: np.ndarray, thresholds: dict) -> np.ndarray:
+    level = np.select(
+        [
+            score >= thresholds.get("EXIT", 70),
+            score >= thresholds.get("TRIM", 50),
+            score >= thresholds.get("WATCH", 30),
+        ],
+        [0, 1, 2],
+        3,
+    )
+    return ACTIONS[level]
+
+
+def price_stats(panel: PricePanel, tokens) -> tuple[np.ndarray, ...]:
+    """
+    (bars, volatility, ma50, ma200) for every token in one pass over the panel.
+    MAs fall back to the mean of everything available when a token has fewer
+    bars than the window; values are NaN for tokens with too little history.
+    """
+    n = len(tokens)
+    bars = np.zeros(n, dtype=np.int64)
+    volatility = np.full(n, np.nan)
+    ma50 = np.full(n, np.nan)
+    ma200 = np.full(n, np.nan)
+    if n == 0 or panel.close.size == 0:
+        return bars, volatility, ma50, ma200
+
+    closes, bars = panel.packed(panel.rows_for(tokens))
+    usable = bars >= MIN_HISTORY_BARS
+    if not usable.any():
+        return bars, volatility, ma50, ma200
+
+    closes = closes[usable].astype(float, copy=False)
+    count = bars[usable]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_returns = np.diff(closes, axis=1) / closes[:, :-1]
+        std_dev = np.nanstd(daily_returns, axis=1, ddof=1)
+    volatility[usable] = std_dev * np.sqrt(252)
+
+    full_mean = np.nanmean(closes, axis=1)
+    ma50[usable] = np.where(count >= 50, closes[:, -50:].mean(axis=1), full_mean)
+    ma200[usable] = np.where(count >= 200, closes[:, -200:].mean(axis=1), full_mean)
+
+    return bars, volatility, ma50, ma200
+
+
+def holding_features(holdings_df: pd.DataFrame) -> dict:
+    """The features that need no price history: position size, P&L and weight."""
+    ltp = holdings_df["last_price"].to_numpy(dtype=float)
+    avg_price = holdings_df["average_price"].to_numpy(dtype=float)
+    qty = holdings_df["quantity"].to_numpy()
+
+    value = ltp * qty
+    invested = avg_price * qty
+    total_value = value.sum()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return_pct = np.where(avg_price != 0, (ltp - avg_price) / avg_price * 100, 0.0)
+        weight_pct = value / total_value * 100 if total_value else np.zeros(len(value))
+
+    return {
+        "symbol": holdings_df["tradingsymbol"].to_numpy(),
+        "ltp": ltp,
+        "avg_price": avg_price,
+        "quantity": qty.astype(np.int64),
+        "value": value.astype(float),
+        "invested": invested.astype(float),
+        "return_pct": np.round(return_pct, 2),
+        "weight_pct": np.round(weight_pct, 2),
+    }
+
+
+def history_features(ltp: np.ndarray, avg_price: np.ndarray, stats: tuple) -> dict:
+    """
+    Volatility, MAs and risk-adjusted return from price_stats() output for
+    the same holdings, with the medians of volatility and rar over them.
+    """
+    bars, volatility, ma50, ma200 = stats
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return_pct = np.where(avg_price != 0, (ltp - avg_price) / avg_price * 100, 0.0)
+
+    # Holdings with too little history score as flat: no volatility, MAs at LTP
+    usable = bars >= MIN_HISTORY_BARS
+    volatility = np.where(usable, volatility, 0.0)
+    ma50 = np.where(usable, ma50, ltp)
+    ma200 = np.where(usable, ma200, ltp)
+
+    # Risk-adjusted return (Sharpe-lite: return / volatility)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rar = np.where(volatility > 0, return_pct / volatility, 0.0)
+
+    return {
+        "volatility": np.round(volatility, 4),
+        "ma50": np.round(ma50, 2),
+        "ma200": np.round(ma200, 2),
+        "rar": np.round(rar, 4),
+        # Portfolio-level medians
+        "median_vol": float(np.median(volatility)) if len(volatility) else 0,
+        "median_rar": float(np.median(rar)) if len(rar) else 0,
+    }
+
+
+def exit_features(holdings_df: pd.DataFrame, panel: PricePanel, stats: tuple | None = None) -> dict:
+    """
+    Per-holding inputs to the KPI scores, as columns.
+
+    `stats` is a precomputed price_stats() result for the holdings' tokens
+    (e.g. sliced from one shared across accounts); it is computed from the panel when omitted.
+
+    Values that the scores compare against are rounded exactly as they are
+    reported; `median_vol` / `median_rar` come from the unrounded columns.
+    """
+    if stats is None:
+        stats = price_stats(panel, holdings_df["instrument_token"].to_numpy())
+
+    features = holding_features(holdings_df)
+    return {**features, **history_features(features["ltp"], features["avg_price"], stats)}
+
+
+def score_features(features: dict, fn_scores: dict, kpis=tuple(KPIS)) -> dict[str, np.ndarray]:
+    """The KPI score columns (all five by default) for a feature set."""
+    return {name: score_table(fn_scores, name)[KPIS[name](features)] for name in kpis}
 
 
 # Compute
 def compute_exit_signals(
     holdings_df: pd.DataFrame,
-    history: dict[int, pd.DataFrame],
+    panel: PricePanel,
+    stats: tuple | None = None,
+    settings: dict | None = None,
 ) -> dict:
     """
     Parameters
     ----------
     holdings_df : DataFrame with columns from Kite holdings
         (tradingsymbol, last_price, average_price, quantity, instrument_token, …)
-    history : {instrument_token: DataFrame(date, close, …)}
+    panel : PricePanel of daily closes aligned on trading dates
+    stats : optional precomputed (bars, volatility, ma50, ma200) per holding
+    settings : exit settings to score with (the saved ones by default)
 
     Returns
     -------
     dict with keys: summary, signals (list sorted by exit_score desc)
     """
-    settings = get_settings()
+    lap = stopwatch("exit")
+    settings = settings or get_settings()
     thresholds = settings.get("action_thresholds", {})
     fn_scores = settings.get("function_scores", {})
 
-    total_value = (holdings_df["last_price"] * holdings_df["quantity"]).sum()
-
-    rows = []
-    volatilities = []
-    rars = []
-
-    for _, h in holdings_df.iterrows():
-        token = h["instrument_token"]
-        ltp = h["last_price"]
-        avg_price = h["average_price"]
-        qty = h["quantity"]
-        symbol = h["tradingsymbol"]
-
-        # Return %
-        return_pct = ((ltp - avg_price) / avg_price * 100) if avg_price else 0
-
-        # Current value & weight
-        value = ltp * qty
-        invested = avg_price * qty
-        weight_pct = (value / total_value * 100) if total_value else 0
-
-        # Historical analysis
-        hist = history.get(token)
-        if hist is not None and len(hist) >= 10:
-            closes = hist["close"].values.astype(float)
-            daily_returns = np.diff(closes) / closes[:-1]
-            std_dev = float(np.std(daily_returns, ddof=1)) if len(daily_returns) > 1 else 0
-            volatility = std_dev * np.sqrt(252)
-
-            # Moving averages
-            ma50 = float(np.mean(closes[-50:])) if len(closes) >= 50 else float(np.mean(closes))
-            ma200 = float(np.mean(closes[-200:])) if len(closes) >= 200 else float(np.mean(closes))
-        else:
-            volatility = 0
-            ma50 = ltp
-            ma200 = ltp
-
-        # Risk-adjusted return (Sharpe-lite: return / volatility)
-        rar = (return_pct / volatility) if volatility > 0 else 0
-
-        volatilities.append(volatility)
-        rars.append(rar)
-
-        rows.append({
-            "symbol": symbol,
-            "ltp": float(ltp),
-            "avg_price": float(avg_price),
-            "quantity": int(qty),
-            "value": float(value),
-            "invested": float(invested),
-            "return_pct": round(return_pct, 2),
-            "weight_pct": round(weight_pct, 2),
-            "volatility": round(volatility, 4),
-            "ma50": round(ma50, 2),
-            "ma200": round(ma200, 2),
-            "rar": round(rar, 4),
-        })
-
-    # Portfolio-level medians
-    median_vol = float(np.median(volatilities)) if volatilities else 0
-    median_rar = float(np.median(rars)) if rars else 0
+    features = exit_features(holdings_df, panel, stats)
+    lap("features")
 
     # Score each stock
-    signals = []
-    for r in rows:
-        s1 = _score_loss_severity(r["return_pct"], fn_scores.get("loss_severity", [5, 10, 18, 25]))
-        s2 = _score_risk_vs_median(r["volatility"], median_vol, fn_scores.get("risk_vs_median", [8, 14, 20]))
-        s3 = _score_risk_adj_inefficiency(r["rar"], median_rar, fn_scores.get("risk_adj_inefficiency", [8, 14, 20]))
-        s4 = _score_trend_weakness(r["ltp"], r["ma50"], r["ma200"], fn_scores.get("trend_weakness", [10, 20]))
-        s5 = _score_concentration(r["weight_pct"], fn_scores.get("concentration", [5, 10, 15]))
-
-        exit_score = s1 + s2 + s3 + s4 + s5
-        action = _map_action(exit_score, thresholds)
-
-        signals.append({
-            "symbol": r["symbol"],
-            "ltp": r["ltp"],
-            "avg_price": r["avg_price"],
-            "quantity": r["quantity"],
-            "value": r["value"],
-            "invested": r["invested"],
-            "return_pct": r["return_pct"],
-            "weight_pct": r["weight_pct"],
-            "scores": {
-                "loss_severity": s1,
-                "risk_vs_median": s2,
-                "risk_adj_inefficiency": s3,
-                "trend_weakness": s4,
-                "concentration": s5,
-            },
-            "exit_score": exit_score,
-            "action": action,
-        })
-
-    # Sort descending by exit_score
-    signals.sort(key=lambda x: x["exit_score"], reverse=True)
+    scores = score_features(features, fn_scores)
+    exit_score = sum(scores.values())
+    action = _map_action(exit_score, thresholds)
+    lap("scoring")
 
-    # Summary
-    action_counts = {"EXIT": 0, "TRIM": 0, "WATCH": 0, "HOLD": 0}
-    total_score = 0
-    for s in signals:
-        action_counts[s["action"]] += 1
-        total_score += s["exit_score"]
+    result = build_result(features, scores, exit_score, action)
+    lap("summary")
+
+    return result
+
+
+def build_result(features: dict, scores: dict, exit_score: np.ndarray, action: np.ndarray) -> dict:
+    """Assemble the signals payload, sorted descending by exit_score."""
+    order = np.argsort(-exit_score, kind="stable")
 
+    columns = [
+        features[k][order].tolist()
+        for k in ("symbol", "ltp", "avg_price", "quantity", "value", "invested", "return_pct", "weight_pct")
+    ]
+    kpi_names = list(scores)
+    kpi_columns = [scores[k][order].tolist() for k in kpi_names]
+
+    signals = [
+        {
+            "symbol": symbol,
+            "ltp": ltp,
+            "avg_price": avg_price,
+            "quantity": quantity,
+            "value": value,
+            "invested": invested,
+            "return_pct": return_pct,
+            "weight_pct": weight_pct,
+            "scores": dict(zip(kpi_names, kpi)),
+            "exit_score": score,
+            "action": act,
+        }
+        for symbol, ltp, avg_price, quantity, value, invested, return_pct, weight_pct, *kpi, score, act in zip(
+            *columns, *kpi_columns, exit_score[order].tolist(), action[order].tolist()
+        )
+    ]
+
+    # Summary
     n = len(signals)
+    counts = dict(zip(*np.unique(action, return_counts=True))) if n else {}
     summary = {
         "total_holdings": n,
-        "avg_exit_score": round(total_score / n, 1) if n else 0,
-        "action_counts": action_counts,
-        "median_volatility": round(median_vol, 4),
-        "median_rar": round(median_rar, 4),
+        "avg_exit_score": round(float(exit_score.sum()) / n, 1) if n else 0,
+        "action_counts": {a: int(counts.get(a, 0)) for a in ACTIONS.tolist()},
+        "median_volatility": round(features["median_vol"], 4),
+        "median_rar": round(features["median_rar"], 4),
     }
 
     return {"summary": summary, "signals": signals}
@@ -1,13 +1,46 @@
-from fastapi import APIRouter, Request
-from .service import get_exit_signals
-from .settings import get_settings, save_settings, reset_settings
+from fastapi import APIRouter, Body, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from core.results import market_state, results
+from .service import get_exit_backtest, get_exit_signals, simulate_exit_settings
+from .stream import FORMATS, stream_exit_signals
+from .settings import get_settings, get_settings_version, save_settings, reset_settings
 
 router = APIRouter()
 
 
 @router.get("/signals")
-def exit_signals():
-    return get_exit_signals()
+async def exit_signals(request: Request):
+    return await results.respond(request, "exit/signals", get_settings_version(), market_state, get_exit_signals)
+
+
+@router.get("/signals/stream")
+def exit_signals_stream(format: str = "ndjson"):
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    return StreamingResponse(
+        stream_exit_signals(format),
+        media_type=FORMATS[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/backtest")
+async def exit_backtest(horizons: str = "5,20,60"):
+    try:
+        parsed = sorted({int(h) for h in horizons.split(",") if h.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="horizons must be comma-separated integers")
+    if not parsed or parsed[0] < 1:
+        raise HTTPException(status_code=400, detail="horizons must be positive")
+    return await get_exit_backtest(parsed)
+
+
+@router.post("/simulate")
+async def simulate(body: dict = Body(...)):
+    try:
+        return await simulate_exit_settings(body.get("configs") or [])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/settings")
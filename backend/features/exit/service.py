@@ -1,9 +1,73 @@
-from .data import get_holdings, get_historical_data
-from .compute import compute_exit_signals
+import asyncio
 
+from core import executor, history
+from .data import get_holdings, get_price_panel
+from .backtest import compute_exit_backtest
+from .compute import compute_exit_signals, exit_features
+from .settings import get_settings
+from .simulate import merge_settings, simulate_settings, validate_settings
 
-def get_exit_signals():
-    df = get_holdings()
+MAX_SIMULATION_CONFIGS = 5000
+
+
+def score_signals(df, settings: dict, panel):
+    """Pool job behind get_exit_signals()."""
+    return compute_exit_signals(df, panel, settings=settings)
+
+
+async def get_exit_signals():
+    df = await asyncio.to_thread(get_holdings)
+    tokens = df["instrument_token"].unique().tolist()
+    panel, errors = await asyncio.to_thread(get_price_panel, tokens)
+    # Settings go with the job: a worker's own store would keep the copy it loaded first
+    result = await executor.run("exit/signals", score_signals, df, get_settings(), panel=panel)
+    # Holdings whose history fetch failed are scored on the candles stored before
+    result["failed"] = history.failed_symbols(df, errors)
+    return result
+
+
+def _simulate(df, configs: list[dict], current: dict, panel):
+    """Pool job behind simulate_exit_settings()."""
+    features = exit_features(df, panel)
+    return simulate_settings(features, configs, current)
+
+
+async def simulate_exit_settings(candidates: list[dict]):
+    """Score candidate settings against the current holdings without saving any of them."""
+    if not candidates:
+        raise ValueError("No configurations to simulate")
+    if len(candidates) > MAX_SIMULATION_CONFIGS:
+        raise ValueError(f"At most {MAX_SIMULATION_CONFIGS} configurations per call")
+
+    current = merge_settings(get_settings(), {})
+    configs = []
+    for i, candidate in enumerate(candidates):
+        if not isinstance(candidate, dict):
+            raise ValueError(f"configs[{i}] must be an object")
+        for key in ("action_thresholds", "function_scores"):
+            if not isinstance(candidate.get(key, {}), dict):
+                raise ValueError(f"configs[{i}].{key} must be an object")
+        config = merge_settings(current, candidate)
+        try:
+            validate_settings(config)
+        except ValueError as e:
+            raise ValueError(f"configs[{i}]: {e}")
+        configs.append(config)
+
+    df = await asyncio.to_thread(get_holdings)
+    tokens = df["instrument_token"].unique().tolist()
+    panel, _ = await asyncio.to_thread(get_price_panel, tokens)
+    return await executor.run("exit/simulate", _simulate, df, configs, current, panel=panel)
+
+
+def _backtest(df, settings: dict, horizons: list[int], panel):
+    return compute_exit_backtest(df, panel, settings, horizons)
+
+
+async def get_exit_backtest(horizons: list[int]):
+    """Daily exit scores over the stored history plus forward returns per action bucket."""
+    df = await asyncio.to_thread(get_holdings)
     tokens = df["instrument_token"].unique().tolist()
-    history = get_historical_data(tokens)
-    return compute_exit_signals(df, history)
+    panel, _ = await asyncio.to_thread(get_price_panel, tokens)
+    settings = merge_settings(get_settings(), {})
+    return await executor.run("exit/backtest", _backtest, df, settings, horizons, panel=panel)
@@ -1,4 +1,4 @@
-import sqlite3, json
+from core.settings_store import SettingsStore
 
 DB = "settings.db"
 
@@ -17,31 +17,17 @@ DEFAULT = {
     }
 }
 
-def _ensure_table(conn):
-    conn.execute("CREATE TABLE IF NOT EXISTS exit_settings (id INTEGER PRIMARY KEY, config TEXT)")
+_store = SettingsStore(DB, "exit_settings", DEFAULT)
 
 def get_settings():
-    conn = sqlite3.connect(DB)
-    _ensure_table(conn)
-    row = conn.execute("SELECT config FROM exit_settings WHERE id=1").fetchone()
-    conn.close()
-    return json.loads(row[0]) if row else DEFAULT
+    return _store.get()
+
+def get_settings_version():
+    return _store.version
 
 def save_settings(config: dict):
-    conn = sqlite3.connect(DB)
-    _ensure_table(conn)
-    conn.execute(
-        "INSERT INTO exit_settings (id, config) VALUES (1, ?) "
-        "ON CONFLICT(id) DO UPDATE SET config = excluded.config",
-        (json.dumps(config),)
-    )
-    conn.commit()
-    conn.close()
+    _store.save(config)
 
 def reset_settings():
-    conn = sqlite3.connect(DB)
-    _ensure_table(conn)
-    conn.execute("DELETE FROM exit_settings WHERE id=1")
-    conn.commit()
-    conn.close()
+    _store.reset()
     return DEFAULT
@@ -0,0 +1,100 @@
+"""
+Exit settings what-if simulator.
+
+Scores a batch of candidate settings against one feature set. KPI bins are
+computed once; each configuration only contributes a row of score tables and
+thresholds, so the whole batch is a handful of broadcast gathers producing a
+(configs × holdings) score matrix.
+"""
+
+import numpy as np
+
+from .compute import ACTIONS, KPIS, kpi_bins, score_table
+from .settings import DEFAULT
+
+THRESHOLD_KEYS = ["EXIT", "TRIM", "WATCH"]
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def merge_settings(base: dict, candidate: dict) -> dict:
+    """Overlay a (possibly partial) candidate onto the base settings."""
+    merged = {}
+    for key in ("action_thresholds", "function_scores"):
+        merged[key] = {**DEFAULT[key], **base.get(key, {}), **(candidate.get(key) or {})}
+    return merged
+
+
+def validate_settings(config: dict):
+    for key in THRESHOLD_KEYS:
+        if not _is_number(config["action_thresholds"].get(key)):
+            raise ValueError(f"action_thresholds.{key} must be a number")
+    for kpi, default in DEFAULT["function_scores"].items():
+        scores = config["function_scores"].get(kpi)
+        if not isinstance(scores, list) or len(scores) != len(default) or not all(map(_is_number, scores)):
+            raise ValueError(f"function_scores.{kpi} must be a list of {len(default)} numbers")
+
+
+def simulate_settings(features: dict, configs: list[dict], baseline: dict) -> dict:
+    """
+    Parameters
+    ----------
+    features : output of exit_features()
+    configs : fully merged candidate settings
+    baseline : the settings currently in effect, used to report action changes
+
+    Returns
+    -------
+    dict with keys: baseline (action counts), results (one entry per config)
+    """
+    symbols = features["symbol"]
+    bins = kpi_bins(features)
+    everything = [baseline, *configs]
+
+    # (configs, holdings): gather each config's score row at every holding's bin.
+    # Scores may be floats; the total takes their common type as compute_exit_signals' sum does
+    tables = {kpi: np.stack([score_table(c["function_scores"], kpi) for c in everything]) for kpi in KPIS}
+    total = np.zeros((len(everything), len(symbols)), dtype=np.result_type(*tables.values()))
+    for kpi, table in tables.items():
+        total += table[:, bins[kpi]]
+
+    thresholds = np.array(
+        [[c["action_thresholds"][k] for k in THRESHOLD_KEYS] for c in everything],
+        dtype=float,
+    )
+    # Level 0..3 = EXIT, TRIM, WATCH, HOLD; the first threshold hit in that order wins
+    hit = total[:, :, None] >= thresholds[:, None, :]
+    level = np.where(hit.any(axis=2), hit.argmax(axis=2), 3)
+
+    counts = np.stack([(level == i).sum(axis=1) for i in range(len(ACTIONS))], axis=1)
+    base_level = level[0]
+    changed = level[1:] != base_level
+
+    results = []
+    for i in range(len(configs)):
+        moved = np.flatnonzero(changed[i])
+        results.append({
+            "index": i,
+            "action_counts": dict(zip(ACTIONS.tolist(), counts[i + 1].tolist())),
+            "avg_exit_score": round(float(total[i + 1].mean()), 1) if len(symbols) else 0,
+            "changed_count": int(moved.size),
+            "changes": [
+                {
+                    "symbol": str(symbols[j]),
+                    "from": str(ACTIONS[base_level[j]]),
+                    "to": str(ACTIONS[level[i + 1, j]]),
+                    "exit_score": total[i + 1, j].item(),
+                }
+                for j in moved.tolist()
+            ],
+        })
+
+    return {
+        "baseline": {
+            "action_counts": dict(zip(ACTIONS.tolist(), counts[0].tolist())),
+            "avg_exit_score": round(float(total[0].mean()), 1) if len(symbols) else 0,
+        },
+        "results": results,
+    }
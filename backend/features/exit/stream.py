@@ -0,0 +1,124 @@
+"""
+Exit signals as a stream of events, so rows show up before the slowest
+instrument's history has been fetched.
+
+1. `holding` per holding, straight from the holdings snapshot: position
+   columns and the KPIs that need no history (HOLDING_KPIS).
+2. `history` per holding as its token's candles land in the store:
+   volatility, MAs, risk-adjusted return and the KPIs on the holding's own
+   history (HISTORY_KPIS).
+3. `summary` once everything is in: the portfolio medians, the
+   median-relative KPIs (MEDIAN_KPIS), exit scores and actions for every
+   holding, ranked as /signals ranks them. It is computed exactly as
+   /signals is, so a client that keeps only the summary's values ends up
+   with the same table.
+
+Events go out as newline-delimited JSON (`{"event": ..., ...}` per line)
+or as server-sent events.
+"""
+
+import asyncio
+import json
+
+import numpy as np
+
+from core import executor, history
+from core.history import load_panel
+from .compute import (
+    HISTORY_KPIS,
+    HOLDING_KPIS,
+    MEDIAN_KPIS,
+    history_features,
+    holding_features,
+    price_stats,
+    score_features,
+)
+from .data import get_holdings
+from .service import score_signals
+from .settings import get_settings
+
+FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+HOLDING_COLUMNS = ("ltp", "avg_price", "quantity", "value", "invested", "return_pct", "weight_pct")
+HISTORY_COLUMNS = ("volatility", "ma50", "ma200", "rar")
+
+
+def _encode(event: str, payload: dict, fmt: str) -> bytes:
+    if fmt == "sse":
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode()
+    return (json.dumps({"event": event, **payload}) + "\n").encode()
+
+
+def _rows(features: dict, scores: dict, positions: np.ndarray, columns: tuple) -> list[dict]:
+    rows = []
+    for i in positions.tolist():
+        row = {"symbol": features["symbol"][i]}
+        row.update({c: features[c][i].item() for c in columns})
+        row["scores"] = {name: s[i].item() for name, s in scores.items()}
+        rows.append(row)
+    return rows
+
+
+def _history_rows(df, fn_scores: dict, tokens: list[int], positions: dict) -> list[dict]:
+    """`history` payloads for the holdings on `tokens`, read from the store."""
+    rows = np.concatenate([positions[t] for t in tokens])
+    sub = df.iloc[rows]
+    panel = load_panel(tokens)
+    ltp = sub["last_price"].to_numpy(dtype=float)
+    stats = price_stats(panel, sub["instrument_token"].to_numpy())
+    features = history_features(ltp, sub["average_price"].to_numpy(dtype=float), stats)
+    features.update(symbol=sub["tradingsymbol"].to_numpy(), ltp=ltp)
+    scores = score_features(features, fn_scores, HISTORY_KPIS)
+    return _rows(features, scores, np.arange(len(sub)), HISTORY_COLUMNS)
+
+
+async def stream_exit_signals(fmt: str = "ndjson"):
+    """Async iterator of encoded events; see the module docstring."""
+    df = await asyncio.to_thread(get_holdings)
+    df = df.reset_index(drop=True)
+    settings = get_settings()
+    fn_scores = settings.get("function_scores", {})
+
+    base = holding_features(df)
+    for row in _rows(base, score_features(base, fn_scores, HOLDING_KPIS), np.arange(len(df)), HOLDING_COLUMNS):
+        yield _encode("holding", row, fmt)
+
+    tokens = df["instrument_token"].dropna().astype(np.int64)
+    positions = {int(t): idx.to_numpy() for t, idx in tokens.groupby(tokens).groups.items()}
+
+    loop = asyncio.get_running_loop()
+    arrived = asyncio.Queue()
+
+    def synced(batch):
+        loop.call_soon_threadsafe(arrived.put_nowait, batch)
+
+    async def sync():
+        try:
+            return await asyncio.to_thread(history.sync_history, list(positions), None, synced)
+        finally:
+            await arrived.put(None)
+
+    syncing = asyncio.create_task(sync())
+    while (batch := await arrived.get()) is not None:
+        batch = [t for t in batch if t in positions]
+        if batch:
+            for row in await asyncio.to_thread(_history_rows, df, fn_scores, batch, positions):
+                yield _encode("history", row, fmt)
+    await syncing
+
+    panel = await asyncio.to_thread(load_panel, list(positions))
+    result = await executor.run("exit/signals", score_signals, df, settings, panel=panel)
+    # Errors kept in the store also cover tokens this sync skipped because a recent fetch failed
+    failed = history.failed_symbols(df, await asyncio.to_thread(history.get_errors, list(positions)))
+    yield _encode("summary", {
+        "summary": result["summary"],
+        "signals": [
+            {
+                "symbol": s["symbol"],
+                "scores": {name: s["scores"][name] for name in MEDIAN_KPIS},
+                "exit_score": s["exit_score"],
+                "action": s["action"],
+            }
+            for s in result["signals"]
+        ],
+        "failed": failed,
+    }, fmt)
@@ -0,0 +1,263 @@
+"""
+Bounded cache of fragility correlation matrices and their clusters.
+
+Entries are keyed by (token set, window_days, last bar date,
+min_return_points). Each holds the matrix in sorted-token order with the
+return sample and per-pair observation counts it was computed from, plus
+the cluster labels derived from it per correlation_threshold. A keyed entry
+is only served while its sample still matches, since today's partial bar
+can move without the date changing. A universe contained in a cached one is
+served from the cached sub-matrix when its returns agree with the cached
+columns date for date; pairwise-complete correlation of a pair depends on
+nothing else.
+
+Memory is bounded by FRAGILITY_CACHE_MB with least-recently-used eviction.
+With FRAGILITY_CACHE_DIR set, evicted entries are spilled there (up to
+FRAGILITY_CACHE_DISK_MB) and read back on a later miss.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config import FRAGILITY_CACHE_DIR, FRAGILITY_CACHE_DISK_MB, FRAGILITY_CACHE_MB
+from .compute import threshold_components
+
+
+class _Entry:
+    __slots__ = ("tokens", "days", "sample", "values", "counts", "labels")
+
+    def __init__(self, tokens, days, sample, values, counts):
+        self.tokens = tokens  # sorted int64 (n,)
+        self.days = days  # int64 sample dates (m,)
+        self.sample = sample  # (m, n), columns in token order, NaN gaps
+        self.values = values  # (n, n)
+        self.counts = counts  # (n, n) observations per pair
+        self.labels = {}  # {threshold: cluster label per token}
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.sample, self.values, self.counts, *self.labels.values())
+        return sum(a.nbytes for a in arrays)
+
+    def matches(self, days: np.ndarray, sample: np.ndarray) -> bool:
+        return np.array_equal(self.days, days) and np.array_equal(self.sample, sample, equal_nan=True)
+
+
+def _digest(key: tuple) -> str:
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+class CorrelationCache:
+    def __init__(self, max_bytes: float, spill_dir: str | None = None, spill_max_bytes: float = 0):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {key: _Entry}, least recently used first
+        self._bytes = 0
+        self._counters = dict.fromkeys(
+            ("hits", "subset_hits", "spill_hits", "misses", "stale", "evictions", "spills"), 0
+        )
+
+    def view(self, window_days: int, min_return_points: int, compute) -> "_View":
+        """Per-request correlate/cluster hooks for compute_fragility_overview()."""
+        return _View(self, window_days, min_return_points, compute)
+
+    def _count(self, name: str):
+        self._counters[name] += 1
+
+    def lookup(self, key: tuple, tokens: np.ndarray, days: np.ndarray, sample: np.ndarray) -> _Entry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.matches(days, sample):
+                    self._entries.move_to_end(key)
+                    self._count("hits")
+                    return entry
+                self._count("stale")
+                self._drop(key)
+
+            entry = self._from_superset(key, tokens, days, sample)
+            if entry is not None:
+                self._count("subset_hits")
+            else:
+                entry = self._from_disk(key, days, sample)
+                if entry is not None:
+                    self._count("spill_hits")
+            if entry is None:
+                self._count("misses")
+                return None
+            self._put(key, entry)
+            return entry
+
+    def store(self, key: tuple, entry: _Entry):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._put(key, entry)
+
+    def grew(self, key: tuple, added: int):
+        """Account for labels memoised on an entry after it was stored."""
+        with self._lock:
+            if key in self._entries:
+                self._bytes += added
+                self._evict()
+
+    def _from_superset(self, key: tuple, tokens: np.ndarray, days: np.ndarray, sample: np.ndarray) -> _Entry | None:
+        _, window_days, last_day, min_return_points = key
+        for (_, w, last, points), entry in reversed(self._entries.items()):
+            if (w, last, points) != (window_days, last_day, min_return_points) or len(entry.tokens) <= len(tokens):
+                continue
+            columns = np.minimum(np.searchsorted(entry.tokens, tokens), len(entry.tokens) - 1)
+            if not np.array_equal(entry.tokens[columns], tokens):
+                continue
+            at = np.minimum(np.searchsorted(entry.days, days), len(entry.days) - 1)
+            if not np.array_equal(entry.days[at], days):
+                continue
+            cached = entry.sample[:, columns]
+            elsewhere = np.ones(len(entry.days), dtype=bool)
+            elsewhere[at] = False
+            if np.array_equal(cached[at], sample, equal_nan=True) and np.isnan(cached[elsewhere]).all():
+                block = np.ix_(columns, columns)
+                return _Entry(tokens, days, sample, entry.values[block], entry.counts[block])
+        return None
+
+    def _put(self, key: tuple, entry: _Entry):
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        self._evict()
+
+    def _drop(self, key: tuple) -> _Entry:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+        return entry
+
+    def _evict(self):
+        # Always keep the most recent entry, even if it alone is over budget
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            entry = self._drop(key)
+            self._count("evictions")
+            self._spill(key, entry)
+
+    def _spill(self, key: tuple, entry: _Entry):
+        if not self.spill_dir:
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        np.savez(
+            os.path.join(self.spill_dir, _digest(key) + ".npz"),
+            tokens=entry.tokens,
+            days=entry.days,
+            sample=entry.sample,
+            values=entry.values,
+            counts=entry.counts,
+        )
+        self._count("spills")
+
+        files = [os.path.join(self.spill_dir, f) for f in os.listdir(self.spill_dir) if f.endswith(".npz")]
+        files.sort(key=os.path.getmtime, reverse=True)
+        used = 0
+        for path in files:
+            used += os.path.getsize(path)
+            if used > self.spill_max_bytes:
+                os.remove(path)
+
+    def _from_disk(self, key: tuple, days: np.ndarray, sample: np.ndarray) -> _Entry | None:
+        if not self.spill_dir:
+            return None
+        path = os.path.join(self.spill_dir, _digest(key) + ".npz")
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as f:
+            entry = _Entry(f["tokens"], f["days"], f["sample"], f["values"], f["counts"])
+        os.remove(path)
+        return entry if entry.matches(days, sample) else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            served = self._counters["hits"] + self._counters["subset_hits"] + self._counters["spill_hits"]
+            lookups = served + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round(served / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": int(self.max_bytes),
+                "spill_dir": self.spill_dir,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for name in self._counters:
+                self._counters[name] = 0
+
+
+class _View:
+    def __init__(self, cache: CorrelationCache, window_days: int, min_return_points: int, compute):
+        self._cache = cache
+        self._window_days = window_days
+        self._min_return_points = min_return_points
+        self._compute = compute
+        self._key = None
+        self._entry = None
+        self._position = None
+
+    def correlate(self, tokens: np.ndarray, dates: np.ndarray, sample: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        tokens = np.asarray(tokens, dtype=np.int64)
+        order = np.argsort(tokens, kind="stable")
+        sorted_tokens = tokens[order]
+        days = np.asarray(dates).astype("datetime64[D]").astype(np.int64)
+        sorted_sample = np.ascontiguousarray(sample[:, order], dtype=np.float64)
+        key = (
+            hashlib.sha1(sorted_tokens.tobytes()).hexdigest(),
+            self._window_days,
+            int(days[-1]) if len(days) else None,
+            self._min_return_points,
+        )
+
+        entry = self._cache.lookup(key, sorted_tokens, days, sorted_sample)
+        if entry is None:
+            values, counts = self._compute(tokens, dates, sample)
+            block = np.ix_(order, order)
+            values = np.asarray(values, dtype=np.float64)
+            entry = _Entry(sorted_tokens, days, sorted_sample, values[block], counts[block])
+            self._cache.store(key, entry)
+
+        # position[i] = where the i-th requested token sits in the entry
+        self._position = np.empty_like(order)
+        self._position[order] = np.arange(len(order))
+        self._key, self._entry = key, entry
+        block = np.ix_(self._position, self._position)
+        return entry.values[block], entry.counts[block]
+
+    def cluster(self, values: np.ndarray, threshold: float) -> np.ndarray:
+        entry, position = self._entry, self._position
+        labels = entry.labels.get(threshold) if entry is not None else None
+        if labels is None:
+            found = threshold_components(values, threshold)
+            if entry is None:
+                return found
+            labels = np.empty_like(found)
+            labels[position] = found
+            entry.labels[threshold] = labels
+            self._cache.grew(self._key, labels.nbytes)
+
+        # Renumber so components are ordered by their first requested token
+        requested = labels[position]
+        unique, first = np.unique(requested, return_index=True)
+        rank = np.empty(len(unique), dtype=np.int64)
+        rank[np.argsort(first)] = np.arange(len(unique))
+        return rank[np.searchsorted(unique, requested)]
+
+
+correlation_cache = CorrelationCache(
+    FRAGILITY_CACHE_MB * 1024 * 1024,
+    spill_dir=FRAGILITY_CACHE_DIR,
+    spill_max_bytes=FRAGILITY_CACHE_DISK_MB * 1024 * 1024,
+)
@@ -1,8 +1,8 @@
-from collections import defaultdict
-
 import numpy as np
 import pandas as pd
 
+from core.panel import PricePanel
+from core.profiling import stopwatch
 from .settings import get_settings
 
 
@@ -28,25 +28,94 @@ def _empty_result(summary_note: str):
     }
 
 
-def _find(parent, item):
-    while parent[item] != item:
-        parent[item] = parent[parent[item]]
-        item = parent[item]
-    return item
-
-
-def _union(parent, a, b):
-    ra = _find(parent, a)
-    rb = _find(parent, b)
-    if ra != rb:
-        parent[rb] = ra
-
-
-def _pairwise_mean(matrix: pd.DataFrame) -> float:
-    if matrix.shape[0] < 2:
+def _components(adjacency: np.ndarray) -> np.ndarray:
+    """
+    Connected-component label per node, numbered in order of each
+    component's first node. Breadth-first, one vectorised row gather per
+    level, so every node's row is read once.
+    """
+    n = adjacency.shape[0]
+    labels = np.full(n, -1, dtype=np.int64)
+    count = 0
+    for seed in range(n):
+        if labels[seed] >= 0:
+            continue
+        labels[seed] = count
+        frontier = np.zeros(n, dtype=bool)
+        frontier[seed] = True
+        while frontier.any():
+            frontier = adjacency[frontier].any(axis=0) & (labels < 0)
+            labels[frontier] = count
+        count += 1
+    return labels
+
+
+def threshold_components(values: np.ndarray, threshold: float) -> np.ndarray:
+    """Cluster labels: connected components of the pairs correlated at or above `threshold`."""
+    adjacency = np.triu(values >= threshold, k=1)
+    return _components(adjacency | adjacency.T)
+
+
+def pair_moments(sample: np.ndarray, shift: np.ndarray) -> tuple[np.ndarray, ...]:
+    """
+    Pairwise-complete sufficient statistics of a (dates × symbols) sample
+    with NaN gaps, each (symbols × symbols), as matrix products over the
+    validity mask:
+
+    count[i, j] = dates where both i and j have a return
+    sum_x[i, j] = Σ x_i over those dates       (sum_x.T gives Σ x_j)
+    sum_xx[i, j] = Σ x_i² over those dates
+    sum_xy[i, j] = Σ x_i · x_j
+
+    Columns are shifted by `shift` first; correlation is shift-invariant and
+    returns centred near zero keep the products well-conditioned. Moments of
+    disjoint row blocks add, so a window can be slid by adding and
+    subtracting the moments of the rows that enter and leave it.
+    """
+    valid = ~np.isnan(sample)
+    mask = valid.astype(float)
+    x = np.where(valid, sample - shift, 0.0)
+    return mask.T @ mask, x.T @ mask, (x * x).T @ mask, x.T @ x
+
+
+def moments_correlation(count, sum_x, sum_xx, sum_xy) -> np.ndarray:
+    """
+    Pearson correlation per pair from pair_moments(); NaN where undefined.
+    Also takes stacks of moments (..., symbols, symbols).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # var[i, j] = variance term of i over the dates shared with j
+        var = np.square(sum_x)
+        var /= count
+        np.subtract(sum_xx, var, out=var)
+        # A constant series cancels to round-off rather than exactly zero
+        var[var <= sum_xx * 1e-12] = np.nan
+
+        corr = np.multiply(sum_x, np.swapaxes(sum_x, -1, -2))
+        corr /= count
+        np.subtract(sum_xy, corr, out=corr)
+        var *= np.swapaxes(var, -1, -2)
+        np.sqrt(var, out=var)
+        corr /= var
+    corr[count < 2] = np.nan
+    return np.clip(corr, -1.0, 1.0, out=corr)
+
+
+def pairwise(tokens: np.ndarray, dates: np.ndarray, sample: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pairwise-complete correlation of a (dates × symbols) return sample with
+    NaN gaps, and the number of dates behind each pair.
+    """
+    with np.errstate(invalid="ignore"):
+        shift = np.nan_to_num(np.nanmean(sample, axis=0)) if sample.size else np.zeros(sample.shape[1])
+    count, sum_x, sum_xx, sum_xy = pair_moments(sample, shift)
+    return moments_correlation(count, sum_x, sum_xx, sum_xy), count.astype(np.int64)
+
+
+def _pairwise_mean(values: np.ndarray) -> float:
+    if values.shape[0] < 2:
         return 1.0
 
-    values = matrix.to_numpy(dtype=float)
     upper = values[np.triu_indices(values.shape[0], k=1)]
     if upper.size == 0:
         return 1.0
@@ -55,24 +124,44 @@ def _pairwise_mean(matrix: pd.DataFrame) -> float:
     return mean if np.isfinite(mean) else 0.0
 
 
-def _cluster_enb(weights: pd.Series, corr: pd.DataFrame) -> float:
-    if corr.empty:
+def _cluster_enb(cluster_weights: np.ndarray, corr: np.ndarray) -> float:
+    if corr.size == 0:
         return 0.0
 
-    cluster_weights = weights.loc[corr.index].to_numpy(dtype=float)
     weight_sum = float(cluster_weights.sum())
     if weight_sum <= 0:
         return float(corr.shape[0])
 
     normalized = cluster_weights / weight_sum
-    denom = float(normalized @ corr.to_numpy(dtype=float) @ normalized)
+    denom = float(normalized @ corr @ normalized)
     if denom <= 0:
         return float(corr.shape[0])
 
     return float(1.0 / denom)
 
 
-def compute_fragility_overview(holdings_df: pd.DataFrame, history: dict[int, pd.DataFrame]) -> dict:
+def compute_fragility_overview(
+    holdings_df: pd.DataFrame,
+    panel: PricePanel,
+    correlate=pairwise,
+    cluster=threshold_components,
+    heatmap_format: str = "full",
+) -> dict:
+    """
+    `correlate(tokens, dates, sample)` turns the return sample (dates ×
+    symbols, in holdings order, NaN where a symbol has no return) into a
+    pairwise-complete correlation matrix and per-pair observation counts;
+    `cluster(values, threshold)` labels its components. The service passes
+    versions backed by the sliding-window engine and the matrix cache.
+    Pairs with fewer than min_return_points common dates count as
+    uncorrelated.
+
+    `heatmap_format` controls heatmap.matrix: "full" (N×N nested lists),
+    "array" (the cluster-ordered ndarray plus per-pair `observations`, for
+    the encoders in heatmap.py) or "none" (omitted; symbols and
+    cluster_breaks are still returned).
+    """
+    lap = stopwatch("fragility")
     settings = get_settings()
     window_days = settings["window_days"]
     min_return_points = settings["min_return_points"]
@@ -98,69 +187,68 @@ def compute_fragility_overview(holdings_df: pd.DataFrame, history: dict[int, pd.
 
     weights = (df.set_index("tradingsymbol")["value"] / total_value).sort_values(ascending=False)
 
-    returns_map = {}
+    n_dates = len(panel.dates)
+    returns_rows = []
+    return_symbols = []
+    return_tokens = []
     excluded_symbols = []
 
-    for _, row in df.iterrows():
-        symbol = row["tradingsymbol"]
-        token = row.get("instrument_token")
-        hist = history.get(token)
-        if hist is None or hist.empty or "close" not in hist:
+    for symbol, token in zip(df["tradingsymbol"], df["instrument_token"]):
+        row = panel.row(token) if pd.notna(token) else None
+        if row is None:
             excluded_symbols.append(symbol)
             continue
 
-        closes = (
-            hist.sort_values("date")
-            .tail(window_days + 1)
-            .set_index("date")["close"]
-            .astype(float)
-        )
-        if len(closes) < min_return_points + 1:
+        # The symbol's own last window_days + 1 bars, gaps in its calendar skipped
+        bars = np.flatnonzero(~np.isnan(row))[-(window_days + 1):]
+        if len(bars) < min_return_points + 1:
             excluded_symbols.append(symbol)
             continue
 
-        returns = closes.pct_change().dropna()
-        if len(returns) < min_return_points:
-            excluded_symbols.append(symbol)
-            continue
+        closes = row[bars].astype(float)
+        returns = np.full(n_dates, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns[bars[1:]] = closes[1:] / closes[:-1] - 1.0
 
-        returns_map[symbol] = returns
+        returns_rows.append(returns)
+        return_symbols.append(symbol)
+        return_tokens.append(int(token))
 
-    if not returns_map:
+    if not returns_rows:
         note = "Insufficient historical data to build the correlation heatmap."
         if excluded_symbols:
             note = f"{note} Excluded: {', '.join(excluded_symbols[:5])}"
         return _empty_result(note)
 
-    returns_df = pd.concat(returns_map, axis=1).dropna(how="any")
-    if returns_df.shape[0] < min_return_points:
-        note = "Not enough overlapping return history to compute correlations."
-        if excluded_symbols:
-            note = f"{note} Excluded: {', '.join(excluded_symbols[:5])}"
-        return _empty_result(note)
+    # Every date on which any symbol has a return; gaps stay NaN
+    returns_matrix = np.vstack(returns_rows)
+    observed = ~np.isnan(returns_matrix).all(axis=0)
+    sample = returns_matrix[:, observed].T
+
+    lap("returns")
 
-    corr = returns_df.corr().fillna(0.0)
-    for sym in corr.columns:
-        corr.loc[sym, sym] = 1.0
+    values, counts = correlate(np.array(return_tokens, dtype=np.int64), panel.dates[observed], sample)
+    values[np.isnan(values) | (counts < min_return_points)] = 0.0
+    np.fill_diagonal(values, 1.0)
+    symbols = return_symbols
 
-    symbols = list(corr.columns)
+    lap("correlation")
 
-    parent = {sym: sym for sym in symbols}
-    for i, left in enumerate(symbols):
-        for right in symbols[i + 1 :]:
-            if float(corr.loc[left, right]) >= threshold:
-                _union(parent, left, right)
+    # Symbol-aligned lookups; value is the first holding's, as the symbols are
+    sym_weight = weights.reindex(symbols).fillna(0.0).to_numpy(dtype=float)
+    first_value = df.drop_duplicates("tradingsymbol").set_index("tradingsymbol")["value"]
+    sym_value = first_value.reindex(symbols).to_numpy(dtype=float)
 
-    components = defaultdict(list)
-    for sym in symbols:
-        components[_find(parent, sym)].append(sym)
+    labels = cluster(values, threshold)
+
+    components = np.split(np.argsort(labels, kind="stable"), np.cumsum(np.bincount(labels))[:-1])
 
     cluster_entries = []
-    for idx, members in enumerate(components.values(), start=1):
-        members = sorted(members, key=lambda s: (-float(weights.get(s, 0.0)), s))
-        sub_corr = corr.loc[members, members]
-        cluster_weight = float(weights.reindex(members).fillna(0.0).sum())
-        cluster_enb = _cluster_enb(weights, sub_corr)
+    for idx, component in enumerate(components, start=1):
+        members = sorted(component.tolist(), key=lambda i: (-sym_weight[i], symbols[i]))
+        sub_corr = values[np.ix_(members, members)]
+        cluster_weight = float(sym_weight[members].sum())
+        cluster_enb = _cluster_enb(sym_weight[members], sub_corr)
         avg_corr = _pairwise_mean(sub_corr)
 
         cluster_entries.append({
@@ -172,11 +260,11 @@ def compute_fragility_overview(holdings_df: pd.DataFrame, history: dict[int, pd.
             "size": len(members),
             "symbols": [
                 {
-                    "symbol": sym,
-                    "weight_pct": round(float(weights.get(sym, 0.0)) * 100, 1),
-                    "value": round(float(df.loc[df["tradingsymbol"] == sym, "value"].iloc[0]), 2),
+                    "symbol": symbols[i],
+                    "weight_pct": round(float(sym_weight[i]) * 100, 1),
+                    "value": round(float(sym_value[i]), 2),
                 }
-                for sym in members
+                for i in members
             ],
         })
 
@@ -185,6 +273,8 @@ def compute_fragility_overview(holdings_df: pd.DataFrame, history: dict[int, pd.
         cluster["id"] = idx
         cluster["name"] = f"Cluster {idx}"
 
+    lap("clustering")
+
     ordered_symbols = []
     cluster_breaks = []
     for cluster in cluster_entries:
@@ -192,28 +282,42 @@ def compute_fragility_overview(holdings_df: pd.DataFrame, history: dict[int, pd.
             cluster_breaks.append(len(ordered_symbols))
         ordered_symbols.extend([item["symbol"] for item in cluster["symbols"]])
 
-    heatmap = corr.reindex(index=ordered_symbols, columns=ordered_symbols)
-    matrix = [[round(float(heatmap.iloc[i, j]), 4) for j in range(heatmap.shape[1])] for i in range(heatmap.shape[0])]
+    position = {sym: i for i, sym in enumerate(symbols)}
+    order = [position[sym] for sym in ordered_symbols]
+    heatmap = values[np.ix_(order, order)]
+    observations = None
+    if heatmap_format == "full":
+        matrix = [[round(v, 4) for v in row] for row in heatmap.tolist()]
+    elif heatmap_format == "array":
+        matrix = heatmap
+        observations = counts[np.ix_(order, order)]
+    else:
+        matrix = None
+
+    lap("heatmap")
 
     portfolio_weights = weights.reindex(ordered_symbols).fillna(0.0)
     normalized = portfolio_weights.to_numpy(dtype=float)
-    denom = float(normalized @ heatmap.to_numpy(dtype=float) @ normalized)
+    denom = float(normalized @ heatmap @ normalized)
     portfolio_enb = float(1.0 / denom) if denom > 0 else float(len(ordered_symbols))
 
-    upper = corr.to_numpy(dtype=float)[np.triu_indices(corr.shape[0], k=1)]
+    pairs = np.triu_indices(len(symbols), k=1)
+    upper = values[pairs]
     avg_pairwise_corr = float(np.nanmean(upper)) if upper.size else 0.0
+    pair_counts = counts[pairs]
+    sparse_pairs = int((pair_counts < min_return_points).sum())
 
     strongest_pair = {"symbols": [], "corr": 0.0}
-    if corr.shape[0] > 1:
-        best = -1.0
-        best_pair = ()
-        for i, left in enumerate(ordered_symbols):
-            for right in ordered_symbols[i + 1 :]:
-                value = float(corr.loc[left, right])
-                if value > best:
-                    best = value
-                    best_pair = (left, right)
-        strongest_pair = {"symbols": list(best_pair), "corr": round(best, 2)}
+    if len(symbols) > 1:
+        # First maximum in row-major order over the upper triangle of the ordered matrix
+        rows, cols = np.triu_indices(len(ordered_symbols), k=1)
+        upper_ordered = heatmap[rows, cols]
+        best = int(np.argmax(upper_ordered))
+        if upper_ordered[best] > -1.0:
+            best_pair = [ordered_symbols[rows[best]], ordered_symbols[cols[best]]]
+            strongest_pair = {"symbols": best_pair, "corr": round(float(upper_ordered[best]), 2)}
+        else:
+            strongest_pair = {"symbols": [], "corr": -1.0}
 
     largest_cluster_weight = max((c["weight_pct"] for c in cluster_entries), default=0.0)
 
@@ -223,6 +327,11 @@ def compute_fragility_overview(holdings_df: pd.DataFrame, history: dict[int, pd.
             f"Excluded {len(excluded_symbols)} holding(s) with insufficient history: "
             + ", ".join(excluded_symbols[:5])
         )
+    if sparse_pairs:
+        warnings.append(
+            f"{sparse_pairs} of {pair_counts.size} pair(s) share fewer than {min_return_points} "
+            "return dates and are treated as uncorrelated."
+        )
 
     enb_rows = []
     for cluster in cluster_entries:
@@ -237,8 +346,9 @@ def compute_fragility_overview(holdings_df: pd.DataFrame, history: dict[int, pd.
             })
 
     enb_rows.sort(key=lambda row: (-row["enb_share"], -row["weight_pct"], row["symbol"]))
+    lap("summary")
 
-    return {
+    result = {
         "summary": {
             "total_holdings": int(len(df)),
             "usable_holdings": int(len(ordered_symbols)),
@@ -248,6 +358,12 @@ def compute_fragility_overview(holdings_df: pd.DataFrame, history: dict[int, pd.
             "avg_pairwise_corr": round(avg_pairwise_corr, 2),
             "window_days": window_days,
             "strongest_pair": strongest_pair,
+            "pair_observations": {
+                "min": int(pair_counts.min()) if pair_counts.size else 0,
+                "median": float(np.median(pair_counts)) if pair_counts.size else 0.0,
+                "max": int(pair_counts.max()) if pair_counts.size else 0,
+                "sparse_pairs": sparse_pairs,
+            },
         },
         "warnings": warnings,
         "heatmap": {
@@ -259,3 +375,6 @@ def compute_fragility_overview(holdings_df: pd.DataFrame, history: dict[int, pd.
         "enb_list": enb_rows,
     }
 
+    if observations is not None:
+        result["heatmap"]["observations"] = observations
+    return result
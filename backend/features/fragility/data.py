@@ -1,36 +1,14 @@
-import pandas as pd
-from datetime import date, timedelta
-from core.kite import get_kite
+from core import holdings
+from core.history import get_panel
+from core.panel import PricePanel
 
 def get_holdings():
-    kite = get_kite()
-    return pd.DataFrame(kite.holdings())
+    return holdings.get_holdings()
 
-def get_historical_data(instrument_tokens: list[int]) -> dict[int, pd.DataFrame]:
+def get_price_panel(instrument_tokens: list[int]) -> tuple[PricePanel, dict[int, str]]:
     """
-    Fetch ~1 year of daily OHLC for each instrument token.
-    Returns {instrument_token: DataFrame(date, open, high, low, close, volume)}.
+    ~1 year of daily closes for each instrument token, served from the local history store
+    as an aligned token × date PricePanel, plus {instrument_token: error} for tokens
+    whose last fetch failed.
     """
-    kite = get_kite()
-    to_date = date.today()
-    from_date = to_date - timedelta(days=365)
-
-    history = {}
-    for token in instrument_tokens:
-        try:
-            records = kite.historical_data(
-                instrument_token=token,
-                from_date=from_date,
-                to_date=to_date,
-                interval="day",
-            )
-            if records:
-                df = pd.DataFrame(records)
-                df["date"] = pd.to_datetime(df["date"]).dt.date
-                history[token] = df
-        except Exception:
-            # Skip instruments where historical data is unavailable
-            pass
-
-    return history
-
+    return get_panel(instrument_tokens)
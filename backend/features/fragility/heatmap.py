@@ -0,0 +1,75 @@
+"""
+Compact heatmap payloads.
+
+The correlation matrix is symmetric with a unit diagonal, so only the strict
+upper triangle is sent, row-major (n·(n−1)/2 values). Values are either
+quantized to int8 (corr ≈ q / 127, within 0.004) or float16 (within 0.0005)
+and base64-encoded little-endian bytes the frontend can view as a typed
+array, or plain JSON numbers rounded to 4 places.
+
+Per-pair observation counts (how many dates both symbols had a return) use
+the same layout, as uint16 bytes or JSON integers.
+
+Large portfolios can start from the cluster-level summary (mean correlation
+between and within clusters) and load one cluster's block at a time.
+"""
+
+import base64
+
+import numpy as np
+
+ENCODINGS = ("int8", "float16", "json")
+INT8_SCALE = 127
+
+
+def encode_upper(matrix: np.ndarray, encoding: str) -> dict:
+    """The strict upper triangle of a symmetric matrix in the requested encoding."""
+    n = matrix.shape[0]
+    upper = matrix[np.triu_indices(n, k=1)]
+    payload = {"size": n, "layout": "upper", "diagonal": 1.0, "encoding": encoding}
+
+    if encoding == "json":
+        payload["data"] = [round(v, 4) for v in upper.tolist()]
+    elif encoding == "int8":
+        quantized = np.rint(np.clip(upper, -1.0, 1.0) * INT8_SCALE).astype(np.int8)
+        payload["scale"] = INT8_SCALE
+        payload["data"] = base64.b64encode(quantized.tobytes()).decode("ascii")
+    elif encoding == "float16":
+        payload["data"] = base64.b64encode(upper.astype("<f2").tobytes()).decode("ascii")
+    else:
+        raise ValueError(f"encoding must be one of {', '.join(ENCODINGS)}")
+    return payload
+
+
+def encode_counts(counts: np.ndarray, encoding: str) -> str | list:
+    """The strict upper triangle of the per-pair observation counts."""
+    upper = counts[np.triu_indices(counts.shape[0], k=1)]
+    if encoding == "json":
+        return upper.tolist()
+    return base64.b64encode(np.minimum(upper, np.iinfo(np.uint16).max).astype("<u2").tobytes()).decode("ascii")
+
+
+def cluster_spans(cluster_breaks: list[int], n: int) -> list[tuple[int, int]]:
+    starts = [0, *cluster_breaks]
+    return list(zip(starts, [*cluster_breaks, n]))
+
+
+def cluster_summary(matrix: np.ndarray, cluster_breaks: list[int]) -> np.ndarray:
+    """
+    (clusters × clusters) mean correlation between the members of each pair
+    of clusters; the diagonal is the mean over distinct pairs within a
+    cluster (1.0 for a single-member cluster).
+    """
+    n = matrix.shape[0]
+    if n == 0:
+        return np.empty((0, 0))
+
+    starts = np.array([0, *cluster_breaks])
+    sizes = np.diff([*starts, n])
+    sums = np.add.reduceat(np.add.reduceat(matrix, starts, axis=0), starts, axis=1)
+
+    summary = sums / np.outer(sizes, sizes)
+    pairs = sizes * (sizes - 1)
+    within = np.divide(np.diag(sums) - sizes, pairs, out=np.ones(len(sizes)), where=pairs > 0)
+    np.fill_diagonal(summary, within)
+    return summary
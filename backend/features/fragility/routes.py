@@ -1,10 +1,85 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 
-from .service import get_fragility_overview
+from core.results import market_state, results
+
+from .heatmap import ENCODINGS
+from .service import (
+    clear_cache,
+    get_cache_stats,
+    get_fragility_overview,
+    get_fragility_timeseries,
+    get_heatmap,
+    get_heatmap_cluster,
+    get_heatmap_clusters,
+)
 
 router = APIRouter()
 
 
 @router.get("/overview")
-def fragility_overview():
-    return get_fragility_overview()
+async def fragility_overview(request: Request, heatmap: str = "full"):
+    if heatmap not in ("full", "none"):
+        raise HTTPException(status_code=400, detail="heatmap must be 'full' or 'none'")
+    # Fragility settings are fixed defaults, so there is no version to key on
+    return await results.respond(
+        request, f"fragility/overview?heatmap={heatmap}", 0, market_state, lambda: get_fragility_overview(heatmap)
+    )
+
+
+@router.get("/timeseries")
+async def fragility_timeseries(windows: str | None = None, days: int | None = None):
+    """Daily fragility metrics per window, e.g. ?windows=30,90&days=120; both count sessions, like the overview's window_days."""
+    try:
+        return await get_fragility_timeseries(windows, days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _check_encoding(encoding: str):
+    if encoding not in ENCODINGS:
+        raise HTTPException(status_code=400, detail=f"encoding must be one of {', '.join(ENCODINGS)}")
+
+
+# The heatmap views are keyed like /overview, so polling and drilling into clusters
+# reuse one computation until holdings or history move
+@router.get("/heatmap")
+async def heatmap(request: Request, encoding: str = "int8", observations: bool = False):
+    _check_encoding(encoding)
+    return await results.respond(
+        request,
+        f"fragility/heatmap?encoding={encoding}&observations={observations}",
+        0,
+        market_state,
+        lambda: get_heatmap(encoding, observations),
+    )
+
+
+@router.get("/heatmap/clusters")
+async def heatmap_clusters(request: Request):
+    return await results.respond(request, "fragility/heatmap/clusters", 0, market_state, get_heatmap_clusters)
+
+
+@router.get("/heatmap/clusters/{cluster_id}")
+async def heatmap_cluster(request: Request, cluster_id: int, encoding: str = "int8", observations: bool = False):
+    _check_encoding(encoding)
+    try:
+        return await results.respond(
+            request,
+            f"fragility/heatmap/clusters/{cluster_id}?encoding={encoding}&observations={observations}",
+            0,
+            market_state,
+            lambda: get_heatmap_cluster(cluster_id, encoding, observations),
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail="No such cluster")
+
+
+@router.get("/cache")
+async def cache_stats():
+    return await get_cache_stats()
+
+
+@router.post("/cache/clear")
+async def do_clear_cache():
+    await clear_cache()
+    return {"status": "ok"}
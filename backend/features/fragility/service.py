@@ -1,9 +1,167 @@
-from .data import get_holdings, get_historical_data
-from .compute import compute_fragility_overview
+import asyncio
 
+import numpy as np
 
-def get_fragility_overview():
-    df = get_holdings()
+from core import executor, history
+from core.panel import PricePanel
+from .data import get_holdings, get_price_panel
+from .cache import correlation_cache
+from .compute import compute_fragility_overview, pairwise
+from .heatmap import ENCODINGS, cluster_spans, cluster_summary, encode_counts, encode_upper
+from .settings import get_settings
+from .timeseries import DEFAULT_WINDOWS, compute_fragility_timeseries
+
+
+async def _snapshot():
+    """Holdings, their price panel and the tokens whose history fetch failed, fetched on worker threads."""
+    df = await asyncio.to_thread(get_holdings)
     tokens = df["instrument_token"].dropna().unique().tolist() if not df.empty else []
-    history = get_historical_data(tokens) if tokens else {}
-    return compute_fragility_overview(df, history)
+    panel, errors = await asyncio.to_thread(get_price_panel, tokens) if tokens else (PricePanel.empty(), {})
+    return df, panel, errors
+
+
+def _report_failed(result: dict, df, errors: dict) -> dict:
+    failed = history.failed_symbols(df, errors)
+    if failed:
+        result["warnings"].append(
+            f"Could not refresh history for {len(failed)} holding(s); their last stored candles are used: "
+            + ", ".join(failed[:5])
+        )
+    result["failed"] = failed
+    return result
+
+
+def _overview(df, heatmap_format: str, panel):
+    settings = get_settings()
+    view = correlation_cache.view(settings["window_days"], settings["min_return_points"], pairwise)
+    return compute_fragility_overview(df, panel, view.correlate, view.cluster, heatmap_format)
+
+
+async def get_fragility_overview(heatmap_format: str = "full"):
+    df, panel, errors = await _snapshot()
+    result = await executor.run("fragility/overview", _overview, df, heatmap_format, panel=panel)
+    return _report_failed(result, df, errors)
+
+
+def _timeseries(df, windows: tuple, days: int | None, panel):
+    return compute_fragility_timeseries(df, panel, windows, days)
+
+
+async def get_fragility_timeseries(windows: str | None = None, days: int | None = None):
+    """
+    Daily ENB, average correlation and largest cluster weight per window,
+    e.g. windows="30,90", over the last `days`. Both count sessions, as the
+    overview's window_days does; the default windows include that one.
+    """
+    if windows:
+        try:
+            windows = tuple(int(w) for w in windows.split(","))
+        except ValueError:
+            raise ValueError("windows must be a comma-separated list of session counts")
+    else:
+        windows = (*DEFAULT_WINDOWS, get_settings()["window_days"])
+    if any(w < 2 for w in windows):
+        raise ValueError("each window must be at least 2 sessions")
+    if days is not None and days < 1:
+        raise ValueError("days must be positive")
+
+    df, panel, errors = await _snapshot()
+    result = await executor.run("fragility/timeseries", _timeseries, df, windows, days, panel=panel)
+    return _report_failed(result, df, errors)
+
+
+def _heatmap(df, panel):
+    """The array overview plus its symbols, cluster breaks, matrix and counts; runs in a worker."""
+    overview = _overview(df, "array", panel)
+    heatmap = overview["heatmap"]
+    n = len(heatmap["symbols"])
+    if not n:
+        # No holdings or too little history: the overview carries an empty matrix
+        return overview, [], [], np.zeros((0, 0)), np.zeros((0, 0), dtype=np.int64)
+    matrix = np.asarray(heatmap["matrix"], dtype=float).reshape(n, n)
+    counts = heatmap.get("observations", np.zeros((n, n), dtype=np.int64))
+    return overview, heatmap["symbols"], heatmap["cluster_breaks"], matrix, counts
+
+
+def _check_encoding(encoding: str):
+    if encoding not in ENCODINGS:
+        raise ValueError(f"encoding must be one of {', '.join(ENCODINGS)}")
+
+
+def _heatmap_payload(df, encoding: str, observations: bool, panel):
+    _, symbols, cluster_breaks, matrix, counts = _heatmap(df, panel)
+    payload = {"symbols": symbols, "cluster_breaks": cluster_breaks, **encode_upper(matrix, encoding)}
+    if observations:
+        payload["observations"] = encode_counts(counts, encoding)
+    return payload
+
+
+def _clusters_payload(df, panel):
+    overview, symbols, cluster_breaks, matrix, _ = _heatmap(df, panel)
+    spans = cluster_spans(cluster_breaks, len(symbols))
+    summary = cluster_summary(matrix, cluster_breaks)
+    return {
+        "clusters": [
+            {"id": c["id"], "name": c["name"], "size": c["size"], "weight_pct": c["weight_pct"], "start": start}
+            for c, (start, _) in zip(overview["clusters"], spans)
+        ],
+        "matrix": [[round(v, 4) for v in row] for row in summary.tolist()],
+    }
+
+
+def _cluster_payload(df, cluster_id: int, encoding: str, observations: bool, panel):
+    overview, symbols, cluster_breaks, matrix, counts = _heatmap(df, panel)
+    spans = cluster_spans(cluster_breaks, len(symbols))
+    if not 1 <= cluster_id <= len(overview["clusters"]):
+        raise KeyError(f"No cluster {cluster_id}")
+    start, end = spans[cluster_id - 1]
+    payload = {
+        "cluster": overview["clusters"][cluster_id - 1]["name"],
+        "symbols": symbols[start:end],
+        **encode_upper(matrix[start:end, start:end], encoding),
+    }
+    if observations:
+        payload["observations"] = encode_counts(counts[start:end, start:end], encoding)
+    return payload
+
+
+# The heatmap jobs build their payload in the worker, next to its matrix cache,
+# so only the encoded triangle or block comes back rather than the n×n overview.
+async def get_heatmap(encoding: str, observations: bool = False):
+    """Whole-portfolio heatmap as an encoded upper triangle, optionally with per-pair counts."""
+    _check_encoding(encoding)
+    df, panel, _ = await _snapshot()
+    return await executor.run("fragility/heatmap", _heatmap_payload, df, encoding, observations, panel=panel)
+
+
+async def get_heatmap_clusters():
+    """Cluster-level summary matrix; drill into a cluster with get_heatmap_cluster()."""
+    df, panel, _ = await _snapshot()
+    return await executor.run("fragility/heatmap", _clusters_payload, df, panel=panel)
+
+
+async def get_heatmap_cluster(cluster_id: int, encoding: str, observations: bool = False):
+    """One cluster's block of the heatmap; KeyError when there is no such cluster."""
+    _check_encoding(encoding)
+    df, panel, _ = await _snapshot()
+    return await executor.run(
+        "fragility/heatmap", _cluster_payload, df, cluster_id, encoding, observations, panel=panel
+    )
+
+
+def _cache_stats():
+    return correlation_cache.stats()
+
+
+def _clear_cache():
+    correlation_cache.clear()
+
+
+async def get_cache_stats():
+    """This process's cache plus each compute worker's, where the engines run."""
+    return {**_cache_stats(), "workers": await executor.broadcast(_cache_stats)}
+
+
+async def clear_cache():
+    _clear_cache()
+    await executor.broadcast(_clear_cache)
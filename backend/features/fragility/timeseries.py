@@ -0,0 +1,228 @@
+"""
+Fragility metrics as daily time series over several windows at once.
+
+For every session in the price panel and every window we report portfolio
+ENB, average pairwise correlation, the largest cluster's weight and the
+number of usable holdings, with the same pairwise-complete rules as the
+snapshot. Windows and the span are counted in sessions (the panel's trading
+dates), the unit of the snapshot's settings.window_days, so the window equal
+to it ends on the snapshot's values.
+
+Every window slides over the same centred returns panel and validity mask.
+Its per-pair moments (compute.pair_moments) are reduced once, on the first
+day it is covered; after that each session only adds its own rank-one
+moment term and takes off that of the session leaving the window, and a
+cumulative sum over a block of sessions gives every day's moments at once.
+Correlation, ENB and clustering then run on the whole (sessions × symbols ×
+symbols) stack of a block rather than day by day.
+
+Holdings are the current ones, valued at each day's close, so the series
+shows how today's book would have looked over the period.
+"""
+
+import numpy as np
+import pandas as pd
+
+from core.panel import PricePanel
+from core.profiling import stopwatch
+from .compute import moments_correlation, pair_moments
+from .settings import get_settings
+
+# Sessions; the store's LOOKBACK_DAYS hold about 250. The snapshot's window is always added
+DEFAULT_WINDOWS = (30, 90, 180)
+# Bound on sessions × symbols² per block; each block holds ~15 such stacks
+BLOCK_ELEMENTS = 1_000_000
+
+
+def _carried(close: np.ndarray) -> np.ndarray:
+    """Each token's latest close on or before every date; NaN before its first bar."""
+    dates = np.arange(close.shape[1])
+    latest = np.maximum.accumulate(np.where(np.isnan(close), 0, dates), axis=1)
+    carried = np.take_along_axis(close, latest, axis=1)
+    carried[np.isnan(close[:, :1]) & (latest == 0)] = np.nan
+    return carried
+
+
+def _slide(state: list[np.ndarray], factors: tuple, rows: np.ndarray, window: int) -> list[np.ndarray]:
+    """
+    Window moments on each of `rows` (consecutive sessions), given `state`,
+    the moments as of the session before the first. Every row adds its own
+    rank-one pair_moments() term and takes off that of the row `window`
+    sessions earlier; a cumulative sum over the block then yields each day.
+    """
+    moments = []
+    for total, (left, right) in zip(state, factors):
+        step = left[rows, :, None] * right[rows, None, :]
+        gone = rows - window
+        step -= np.multiply(left[gone, :, None], right[gone, None, :])
+        np.cumsum(step, axis=0, out=step)
+        step += total
+        moments.append(step)
+    return moments
+
+
+def _components(adjacency: np.ndarray) -> np.ndarray:
+    """
+    Connected-component labels for a stack of symmetric adjacency matrices:
+    each node ends up with the lowest node index in its component. Labels
+    take the minimum over neighbours, then jump to their label's label,
+    until nothing changes.
+    """
+    days, n, _ = adjacency.shape
+    labels = np.tile(np.arange(n), (days, 1))
+    while True:
+        neighbour = np.where(adjacency, labels[:, None, :], n).min(axis=2)
+        updated = np.minimum(labels, neighbour)
+        updated = np.take_along_axis(updated, updated, axis=1)
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def _metrics(moments: list[np.ndarray], weight: np.ndarray, points: int, threshold: float) -> dict:
+    """Per-day fragility metrics from a stack of window moments."""
+    days, n, _ = moments[0].shape
+    count = np.rint(moments[0])
+    values = moments_correlation(count, *moments[1:])
+
+    diagonal = np.arange(n)
+    usable = count[:, diagonal, diagonal] >= points
+    keep = (count >= points) & usable[:, :, None] & usable[:, None, :]
+    values[~keep | np.isnan(values)] = 0.0
+    values[:, diagonal, diagonal] = usable
+
+    weight = np.where(usable, weight, 0.0)
+    k = usable.sum(axis=1)
+
+    denom = np.einsum("di,dij,dj->d", weight, values, weight)
+    with np.errstate(divide="ignore"):
+        enb = np.where(denom > 0, 1.0 / denom, k)
+
+    u = usable.astype(float)
+    pairs = k * (k - 1) / 2
+    pair_sum = (np.einsum("di,dij,dj->d", u, values, u) - k) / 2
+    avg_corr = np.divide(pair_sum, pairs, out=np.zeros(days), where=pairs > 0)
+
+    labels = _components(values >= threshold)
+    offsets = labels + np.arange(days)[:, None] * n
+    cluster_weight = np.bincount(offsets.ravel(), weights=weight.ravel(), minlength=days * n)
+    largest = cluster_weight.reshape(days, n).max(axis=1) * 100
+
+    return {"portfolio_enb": enb, "avg_pairwise_corr": avg_corr, "largest_cluster_weight": largest, "usable": k}
+
+
+def _points(sessions: int, settings: dict) -> int:
+    """min_return_points scaled from settings.window_days (in sessions) to `sessions`."""
+    return max(2, round(settings["min_return_points"] * sessions / settings["window_days"]))
+
+
+def _series(values: np.ndarray, defined: np.ndarray, digits: int) -> list:
+    return [round(float(v), digits) if ok else None for v, ok in zip(values, defined)]
+
+
+def compute_fragility_timeseries(
+    holdings_df: pd.DataFrame,
+    panel: PricePanel,
+    windows: tuple[int, ...] = DEFAULT_WINDOWS,
+    days: int | None = None,
+) -> dict:
+    """
+    Daily portfolio_enb, avg_pairwise_corr, largest_cluster_weight and
+    usable_holdings for each window (in sessions) over the last `days`
+    sessions (all of the panel by default).
+
+    A holding is usable in a window once it has min_return_points returns
+    there, scaled by the window's sessions relative to settings.window_days;
+    pairs below that many common dates count as uncorrelated. A window
+    reports nothing until the panel covers it in full.
+    """
+    lap = stopwatch("fragility_timeseries")
+    settings = get_settings()
+    threshold = settings["correlation_threshold"]
+    windows = sorted(set(windows))
+
+    result = {"dates": [], "windows": [], "warnings": []}
+    if holdings_df is None or holdings_df.empty or len(panel.dates) < 2:
+        result["warnings"].append("No holdings or price history found for fragility analysis.")
+        return result
+
+    df = holdings_df[(holdings_df["quantity"].fillna(0) > 0) & holdings_df["instrument_token"].notna()]
+    quantity = df.groupby(df["instrument_token"].astype(np.int64))["quantity"].sum()
+    rows = panel.rows_for(quantity.index)
+    missing = int((rows < 0).sum())
+    quantity, rows = quantity.to_numpy(dtype=float)[rows >= 0], rows[rows >= 0]
+    if not len(rows):
+        result["warnings"].append("Insufficient historical data to build the fragility time series.")
+        return result
+
+    # Returns between each token's consecutive bars, at the later bar (dates × tokens)
+    close = panel.close[rows].astype(float)
+    carried = _carried(close)
+    previous = np.full_like(carried, np.nan)
+    previous[:, 1:] = carried[:, :-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = (close / previous - 1.0).T
+    value = np.nan_to_num(carried.T * quantity)
+    total = value.sum(axis=1, keepdims=True)
+    weight = np.divide(value, total, out=np.zeros_like(value), where=total > 0)
+
+    valid = ~np.isnan(returns)
+    mask = valid.astype(float)
+    shift = np.nansum(returns, axis=0) / np.maximum(mask.sum(axis=0), 1)
+    x = np.where(valid, returns - shift, 0.0)
+    xx = x * x
+
+    lap("returns")
+
+    total_dates, n = returns.shape
+    start = max(1, total_dates - days) if days else 1
+    dates = panel.dates[start:]
+    block = max(1, BLOCK_ELEMENTS // (n * n))
+
+    # count, sum_x, sum_xx and sum_xy are each a product of two of these
+    factors = ((mask, mask), (x, mask), (xx, mask), (x, x))
+    metrics = ("portfolio_enb", "avg_pairwise_corr", "largest_cluster_weight", "usable")
+    collected = {w: {name: np.full(total_dates - start, np.nan) for name in metrics} for w in windows}
+
+    for w in collected:
+        first = max(start, w)
+        if first >= total_dates:
+            continue
+        # The window's moments as of the session before its first covered day
+        state = list(pair_moments(returns[first - w:first], shift))
+        points = _points(w, settings)
+        for a in range(first, total_dates, block):
+            rows = np.arange(a, min(a + block, total_dates))
+            moments = _slide(state, factors, rows, w)
+            state = [m[-1].copy() for m in moments]
+            found = _metrics(moments, weight[rows], points, threshold)
+            for name, series in found.items():
+                collected[w][name][rows - start] = series
+
+    lap("windows")
+
+    for w in windows:
+        series = collected[w]
+        covered = np.arange(start, total_dates) >= w
+        defined = covered & (series["usable"] > 0)
+        first = np.flatnonzero(covered)
+        result["windows"].append({
+            "window_sessions": w,
+            "min_return_points": _points(w, settings),
+            "available_from": str(dates[first[0]]) if first.size else None,
+            "portfolio_enb": _series(series["portfolio_enb"], defined, 2),
+            "avg_pairwise_corr": _series(series["avg_pairwise_corr"], defined, 2),
+            "largest_cluster_weight": _series(series["largest_cluster_weight"], defined, 1),
+            "usable_holdings": [int(v) if ok else None for v, ok in zip(series["usable"], covered)],
+        })
+        if not first.size:
+            result["warnings"].append(
+                f"The {w}-session window is longer than the {total_dates - 1} sessions of stored history."
+            )
+
+    if missing:
+        result["warnings"].append(f"Excluded {missing} holding(s) with no price history.")
+    result["dates"] = [str(d) for d in dates]
+
+    lap("summary")
+    return result
@@ -0,0 +1,172 @@
+"""
+Live book — exit scores and P&L kept current from ticks.
+
+Built from one exit_features() snapshot. The price-history inputs
+(volatility, MA50/MA200) and the portfolio medians stay fixed until the
+next rebuild; a tick batch only touches the holdings whose price moved:
+their value, return, risk-adjusted return, loss / inefficiency / trend
+bins and the health totals are adjusted by deltas. Weights move with the
+total value for every holding, so concentration bins are re-derived for
+the whole book in one vectorised pass, and only holdings whose exit score
+inputs changed are reported.
+"""
+
+import numpy as np
+import pandas as pd
+
+from features.exit.compute import ACTIONS, KPIS, exit_features, kpi_bins, score_table
+
+# KPIs that depend on a holding's own price
+PRICE_KPIS = ("loss_severity", "risk_adj_inefficiency", "trend_weakness")
+THRESHOLD_KEYS = (("EXIT", 70), ("TRIM", 50), ("WATCH", 30))
+
+
+class LiveBook:
+    def __init__(self, holdings_df: pd.DataFrame, features: dict, settings: dict):
+        self.tokens = holdings_df["instrument_token"].to_numpy(dtype=np.int64)
+        self.features = {k: (v.copy() if isinstance(v, np.ndarray) else v) for k, v in features.items()}
+        f = self.features
+        self.pnl = f["value"] - f["invested"]
+
+        # instrument_token → holding rows (a token can appear more than once)
+        self.index = {}
+        for i, token in enumerate(self.tokens.tolist()):
+            self.index.setdefault(token, []).append(i)
+
+        thresholds = settings.get("action_thresholds", {})
+        fn_scores = settings.get("function_scores", {})
+        self.thresholds = np.array([thresholds.get(k, d) for k, d in THRESHOLD_KEYS], dtype=float)
+        self.tables = {kpi: score_table(fn_scores, kpi) for kpi in KPIS}
+        self.bins = kpi_bins(f)
+        self.exit_score = sum(self.tables[k][b] for k, b in self.bins.items())
+        self.level = self._level(self.exit_score)
+
+        self.total_value = float(f["value"].sum())
+        self.total_invested = float(f["invested"].sum())
+        self.capital_at_risk = float(f["value"][self.pnl < 0].sum())
+        self.score_sum = float(self.exit_score.sum())
+        self.action_counts = np.bincount(self.level, minlength=len(ACTIONS))
+        self.version = 0
+
+    @classmethod
+    def build(cls, holdings_df: pd.DataFrame, panel, stats, settings: dict) -> "LiveBook":
+        return cls(holdings_df, exit_features(holdings_df, panel, stats), settings)
+
+    def _level(self, score: np.ndarray) -> np.ndarray:
+        hit = score[:, None] >= self.thresholds[None, :]
+        return np.where(hit.any(axis=1), hit.argmax(axis=1), 3)
+
+    def prices(self) -> dict:
+        return {token: float(self.features["ltp"][rows[0]]) for token, rows in self.index.items()}
+
+    def apply(self, ticks: dict) -> dict | None:
+        """
+        Fold a batch of {instrument_token: last_price} into the book.
+        Returns the diff (changed rows + health + summary), or None if nothing moved.
+        """
+        f = self.features
+        rows, prices = [], []
+        for token, price in ticks.items():
+            for i in self.index.get(int(token), ()):
+                rows.append(i)
+                prices.append(price)
+        if not rows:
+            return None
+
+        rows = np.array(rows, dtype=np.int64)
+        prices = np.array(prices, dtype=float)
+        moved = prices != f["ltp"][rows]
+        rows, prices = rows[moved], prices[moved]
+        if not rows.size:
+            return None
+
+        # Health totals by delta
+        old_value = f["value"][rows]
+        old_pnl = self.pnl[rows]
+        new_value = prices * f["quantity"][rows]
+        new_pnl = new_value - f["invested"][rows]
+        self.total_value += float((new_value - old_value).sum())
+        self.capital_at_risk += float(new_value[new_pnl < 0].sum() - old_value[old_pnl < 0].sum())
+
+        f["ltp"][rows] = prices
+        f["value"][rows] = new_value
+        self.pnl[rows] = new_pnl
+
+        avg_price = f["avg_price"][rows]
+        volatility = f["volatility"][rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return_pct = np.where(avg_price != 0, (prices - avg_price) / avg_price * 100, 0.0)
+            rar = np.where(volatility > 0, return_pct / volatility, 0.0)
+        f["return_pct"][rows] = np.round(return_pct, 2)
+        f["rar"][rows] = np.round(rar, 4)
+
+        sub = {k: f[k][rows] for k in ("ltp", "return_pct", "rar", "ma50", "ma200")}
+        sub["median_rar"] = f["median_rar"]
+        for kpi in PRICE_KPIS:
+            self.bins[kpi][rows] = KPIS[kpi](sub)
+
+        # Every weight shifts with the total; only bin crossings matter for scores
+        if self.total_value:
+            f["weight_pct"] = np.round(f["value"] / self.total_value * 100, 2)
+        else:
+            f["weight_pct"] = np.zeros(len(self.tokens))
+        concentration = KPIS["concentration"](f)
+        crossed = np.flatnonzero(concentration != self.bins["concentration"])
+        self.bins["concentration"] = concentration
+
+        touched = np.union1d(rows, crossed)
+        score = sum(self.tables[k][b[touched]] for k, b in self.bins.items())
+        level = self._level(score)
+        self.score_sum += float(score.sum() - self.exit_score[touched].sum())
+        np.add.at(self.action_counts, self.level[touched], -1)
+        np.add.at(self.action_counts, level, 1)
+        self.exit_score[touched] = score
+        self.level[touched] = level
+
+        self.version += 1
+        return self._payload(touched)
+
+    def snapshot(self) -> dict:
+        return self._payload(np.arange(len(self.tokens)))
+
+    def _payload(self, rows: np.ndarray) -> dict:
+        f = self.features
+        kpi_names = list(self.bins)
+        columns = [f[k][rows].tolist() for k in ("symbol", "ltp", "value", "return_pct", "weight_pct")]
+        kpi_columns = [self.tables[k][self.bins[k][rows]].tolist() for k in kpi_names]
+        pnl = self.pnl[rows].tolist()
+
+        changed = [
+            {
+                "symbol": symbol,
+                "ltp": ltp,
+                "value": value,
+                "pnl": p,
+                "return_pct": return_pct,
+                "weight_pct": weight_pct,
+                "scores": dict(zip(kpi_names, kpi)),
+                "exit_score": score,
+                "action": action,
+            }
+            for symbol, ltp, value, return_pct, weight_pct, p, *kpi, score, action in zip(
+                *columns, pnl, *kpi_columns, self.exit_score[rows].tolist(), ACTIONS[self.level[rows]].tolist()
+            )
+        ]
+
+        n = len(self.tokens)
+        total_pnl = self.total_value - self.total_invested
+        return {
+            "version": self.version,
+            "rows": changed,
+            "health": {
+                "total_value": self.total_value,
+                "total_pnl": total_pnl,
+                "return_pct": total_pnl / self.total_invested * 100 if self.total_invested else 0,
+                "capital_at_risk": self.capital_at_risk,
+            },
+            "summary": {
+                "total_holdings": n,
+                "avg_exit_score": round(self.score_sum / n, 1) if n else 0,
+                "action_counts": dict(zip(ACTIONS.tolist(), self.action_counts.tolist())),
+            },
+        }
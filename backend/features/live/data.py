@@ -0,0 +1,11 @@
+from core import holdings
+from core.history import get_panel
+from core.panel import PricePanel
+
+
+def get_holdings():
+    return holdings.get_holdings()
+
+
+def get_price_panel(instrument_tokens: list[int]) -> tuple[PricePanel, dict[int, str]]:
+    return get_panel(instrument_tokens)
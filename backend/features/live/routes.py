@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from .service import get_snapshot, refresh, subscribe, unsubscribe
+
+router = APIRouter()
+
+HEARTBEAT_SECONDS = 15
+
+
+def _event(kind: str, data: dict) -> str:
+    return f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/stream")
+async def stream(request: Request):
+    """
+    Server-Sent Events: one `snapshot` with every holding, then `update`
+    events carrying only the rows that changed plus health and summary.
+    """
+    queue, snapshot = await run_in_threadpool(subscribe, asyncio.get_running_loop())
+
+    async def events():
+        try:
+            yield _event("snapshot", snapshot)
+            while not await request.is_disconnected():
+                try:
+                    kind, data = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if kind == "resync":
+                    kind, data = "snapshot", await run_in_threadpool(get_snapshot)
+                yield _event(kind, data)
+        finally:
+            unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/snapshot")
+def snapshot():
+    return get_snapshot()
+
+
+@router.post("/refresh")
+def do_refresh():
+    return refresh()
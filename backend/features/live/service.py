@@ -0,0 +1,138 @@
+"""
+Live stream manager.
+
+The tick source only records the latest price per token; a flusher thread
+folds whatever arrived every LIVE_FLUSH_MS into the book in one batch and
+fans the diff out to subscribers. Tick cost therefore stays a dict write
+however fast prices arrive, and the book work scales with the number of
+distinct tokens that moved per flush rather than with the tick rate.
+The book is rebuilt from fresh holdings and history every
+LIVE_REFRESH_SECONDS (or on refresh()) and subscribers get a new snapshot.
+"""
+
+import asyncio
+import threading
+import time
+
+from config import LIVE_FLUSH_MS, LIVE_REFRESH_SECONDS
+from core.panel import PricePanel
+from core.ticker import create_tick_source
+from features.exit.settings import get_settings
+from .compute import LiveBook
+from .data import get_holdings, get_price_panel
+
+QUEUE_SIZE = 256
+
+_start_lock = threading.Lock()
+_lock = threading.Lock()  # guards the book and the subscriber set
+_book = None
+_built_at = 0.0
+_source = None
+_flusher = None
+_subscribers = {}  # {asyncio.Queue: event loop}
+
+_ticks_lock = threading.Lock()
+_pending = {}
+
+
+def _build() -> LiveBook:
+    df = get_holdings()
+    tokens = df["instrument_token"].unique().tolist() if not df.empty else []
+    panel, _ = get_price_panel(tokens) if tokens else (PricePanel.empty(), {})
+    return LiveBook.build(df, panel, None, get_settings())
+
+
+def _on_ticks(ticks: dict):
+    with _ticks_lock:
+        _pending.update(ticks)
+
+
+def _install(book: LiveBook):
+    global _book, _built_at
+
+    with _lock:
+        _book = book
+        _built_at = time.monotonic()
+        _source.subscribe(book.prices())
+        snapshot = book.snapshot()
+    _publish("snapshot", snapshot)
+    return snapshot
+
+
+def _ensure_started():
+    global _source, _flusher
+
+    with _start_lock:
+        if _flusher is not None:
+            return
+        book = _build()
+        _source = create_tick_source()
+        _install(book)
+        _source.start(_on_ticks)
+        _flusher = threading.Thread(target=_run, daemon=True)
+        _flusher.start()
+
+
+def _run():
+    global _pending, _built_at
+
+    while True:
+        time.sleep(LIVE_FLUSH_MS / 1000)
+        if time.monotonic() - _built_at > LIVE_REFRESH_SECONDS:
+            try:
+                _install(_build())
+            except Exception:
+                # Keep streaming the old book and try again after another interval
+                _built_at = time.monotonic()
+
+        with _ticks_lock:
+            ticks, _pending = _pending, {}
+        if not ticks:
+            continue
+        with _lock:
+            diff = _book.apply(ticks)
+        if diff is not None:
+            _publish("update", diff)
+
+
+def _deliver(queue: asyncio.Queue, event: tuple):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # A slow client can't catch up from diffs it missed; start it over
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(("resync", None))
+
+
+def _publish(kind: str, data: dict):
+    with _lock:
+        targets = list(_subscribers.items())
+    for queue, loop in targets:
+        loop.call_soon_threadsafe(_deliver, queue, (kind, data))
+
+
+def subscribe(loop) -> tuple[asyncio.Queue, dict]:
+    """Register a client queue on `loop`; returns it with the current snapshot."""
+    _ensure_started()
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    with _lock:
+        _subscribers[queue] = loop
+        return queue, _book.snapshot()
+
+
+def unsubscribe(queue: asyncio.Queue):
+    with _lock:
+        _subscribers.pop(queue, None)
+
+
+def get_snapshot() -> dict:
+    _ensure_started()
+    with _lock:
+        return _book.snapshot()
+
+
+def refresh() -> dict:
+    """Rebuild the book from fresh holdings and history now."""
+    _ensure_started()
+    return _install(_build())
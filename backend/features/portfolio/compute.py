@@ -1,4 +1,11 @@
-def compute_overview(df, config):
+import numpy as np
+
+from core.profiling import stopwatch
+from .settings import PortfolioSettings
+
+
+def compute_overview(df, settings: PortfolioSettings):
+    lap = stopwatch("portfolio")
     df["value"] = df["last_price"] * df["quantity"]
     df["invested"] = df["average_price"] * df["quantity"]
     df["pnl"] = df["value"] - df["invested"]
@@ -10,57 +17,42 @@ def compute_overview(df, config):
     capital_at_risk = df[df["pnl"] < 0]["value"].sum()
 
     # ---------- ALLOCATION ----------
-    def classify(sym):
-        for g, arr in config["groups"].items():
-            if sym in arr:
-                return g
-        return "Unassigned"
-
-    df["group"] = df["tradingsymbol"].apply(classify)
-
-    grouped = df.groupby("group").agg({
-        "value": "sum",
-        "invested": "sum",
-        "pnl": "sum"
-    }).reset_index()
+    df["group"] = settings.classify(df["tradingsymbol"])
+
+    grouped = df.groupby("group")[["value", "invested", "pnl"]].sum()
+    val = grouped["value"].to_numpy(dtype=float)
+    inv = grouped["invested"].to_numpy(dtype=float)
+    pnl = grouped["pnl"].to_numpy(dtype=float)
+
+    pct = (val / total_value) * 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pnl_pct = (pnl / inv) * 100
+
+    bounds = settings.targets.reindex(grouped.index)
+    has_target = bounds["min"].notna().to_numpy()
+    tmin = bounds["min"].to_numpy(dtype=float)
+    tmax = bounds["max"].to_numpy(dtype=float)
+    trim = has_target & (pct > tmax)
+    add = has_target & ~trim & (pct < tmin)
+    amount = np.where(trim, val - (tmax / 100) * total_value, np.where(add, (tmin / 100) * total_value - val, 0))
+    kind = np.where(trim, "TRIM", np.where(add, "ADD", "HOLD"))
 
     allocation = []
 
-    for _, r in grouped.iterrows():
-        g = r["group"]
-        val = r["value"]
-        inv = r["invested"]
-        pnl = r["pnl"]
-
-        pct = (val / total_value) * 100
-        pnl_pct = (pnl / inv) * 100 if inv else 0
-
-        t = config["targets"].get(g)
-        if t:
-            tmin, tmax = t
-            if pct > tmax:
-                amt = val - (tmax / 100) * total_value
-                action = {"type": "TRIM", "amount": int(amt)}
-            elif pct < tmin:
-                amt = (tmin / 100) * total_value - val
-                action = {"type": "ADD", "amount": int(amt)}
-            else:
-                action = {"type": "HOLD", "amount": 0}
-            target_str = f"{tmin}-{tmax}%"
-        else:
-            action = {"type": "HOLD", "amount": 0}
-            target_str = "—"
-
+    for i, g in enumerate(grouped.index):
+        t = settings.config["targets"].get(g) if has_target[i] else None
         allocation.append({
             "group": g,
-            "value": float(val),
-            "allocation_pct": round(pct, 1),
-            "pnl": float(pnl),
-            "pnl_pct": round(pnl_pct, 1),
-            "target": target_str,
-            "action": action
+            "value": float(val[i]),
+            "allocation_pct": round(pct[i], 1),
+            "pnl": float(pnl[i]),
+            "pnl_pct": round(pnl_pct[i], 1) if inv[i] else 0,
+            "target": f"{t[0]}-{t[1]}%" if t else "—",
+            "action": {"type": str(kind[i]), "amount": int(amount[i])}
         })
 
+    lap("allocation")
+
     # ---------- CONCENTRATION ----------
     df_sorted = df.sort_values("value", ascending=False)
 
@@ -68,7 +60,7 @@ def compute_overview(df, config):
     top5_val = top5["value"].sum()
     top5_pct = (top5_val / total_value) * 100
 
-    top5_limit = config["concentration"]["top5"]
+    top5_limit = settings.top5_limit
     top5_action = (
         {"type": "TRIM", "amount": int(top5_val - (top5_limit/100)*total_value)}
         if top5_pct > top5_limit else {"type": "HOLD", "amount": 0}
@@ -76,7 +68,7 @@ def compute_overview(df, config):
 
     largest = df_sorted.iloc[0]
     largest_pct = (largest["value"] / total_value) * 100
-    single_limit = config["concentration"]["single"]
+    single_limit = settings.single_limit
 
     largest_action = (
         {"type": "TRIM", "amount": int(largest["value"] - (single_limit/100)*total_value)}
@@ -102,6 +94,8 @@ def compute_overview(df, config):
         }
     ]
 
+    lap("concentration")
+
     return {
         "health": {
             "total_value": float(total_value),
@@ -1,6 +1,4 @@
-import pandas as pd
-from core.kite import get_kite
+from core import holdings
 
 def get_holdings():
-    kite = get_kite()
-    return pd.DataFrame(kite.holdings())
\ No newline at end of file
+    return holdings.get_holdings()
@@ -0,0 +1,217 @@
+"""
+Trade-level rebalance planner.
+
+Turns the overview's group targets and concentration limits into a
+per-symbol order list in whole shares at the current LTP. The plan keeps
+the portfolio's total value fixed: sale proceeds fund the buys and any
+remainder is left as cash, which counts toward the total the limits are
+measured against.
+
+Steps, each vectorised over all positions:
+
+1. Trim every position above the single-holding limit, then level the
+   largest positions down until the top five fit the top-5 limit.
+2. Sell each group's surplus above its target max, largest positions first.
+3. Buy each group's shortfall below its target min, smallest positions
+   first, without taking any position past the concentration limits.
+4. If the buys cost more than the sales raised, fund the difference from
+   groups with room above their min (and from groups without a target) in
+   proportion to that room, again largest positions first.
+
+Selling from the top and buying from the bottom moves no more money than
+each step needs. Within a group, "largest first" and "smallest first" are
+water-filling: every position above (or below) a common level is brought
+to that level, with the level per group found by bisection.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .settings import PortfolioSettings
+
+BISECT_STEPS = 60
+# Share quantities within this of a whole number are taken as whole
+SHARE_TOLERANCE = 1e-6
+
+
+def _fill(base: np.ndarray, room: np.ndarray, codes: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+    """
+    Spread amounts[g] over group g's positions from the lowest `base` up:
+    position i takes clip(level[g] - base[i], 0, room[i]). Negate `base` to
+    take from the highest first. A group asked for more than its total room
+    gets all of it.
+    """
+    if not len(base):
+        return np.zeros(0)
+
+    groups = len(amounts)
+    lo = np.full(groups, base.min())
+    hi = np.full(groups, (base + room).max())
+    for _ in range(BISECT_STEPS):
+        mid = (lo + hi) / 2
+        total = np.bincount(codes, np.clip(mid[codes] - base, 0, room), minlength=groups)
+        over = total >= amounts
+        hi = np.where(over, mid, hi)
+        lo = np.where(over, lo, mid)
+    # The upper bound never falls short of the amount
+    return np.clip(hi[codes] - base, 0, room)
+
+
+def _top5_level(values: np.ndarray, limit: float) -> float:
+    """Highest cap L such that the five largest of min(values, L) sum to at most `limit`."""
+    top = np.sort(values)[::-1][:5]
+    if top.sum() <= limit:
+        return float(top[0]) if len(top) else 0.0
+
+    lo, hi = 0.0, float(top[0])
+    for _ in range(BISECT_STEPS):
+        mid = (lo + hi) / 2
+        if np.minimum(top, mid).sum() > limit:
+            hi = mid
+        else:
+            lo = mid
+    return lo
+
+
+def _concentration(values: np.ndarray, total: float) -> tuple[float, float]:
+    """Top-5 and largest-holding weight, in percent of `total`."""
+    top = np.sort(values)[::-1][:5]
+    return float(top.sum() / total * 100), float(top[0] / total * 100)
+
+
+def plan_rebalance(df: pd.DataFrame, settings: PortfolioSettings) -> dict:
+    """
+    Orders that bring every group with a target into its band and keep the
+    top-5 and single-holding weights within their limits. Targets that
+    cannot be met (a group with no holdings to buy, or minimums that add up
+    to more than the portfolio) are reported in `warnings`.
+    """
+    df = df[(df["quantity"].fillna(0) > 0)].copy()
+    priced = df["last_price"].fillna(0) > 0
+    warnings = []
+    if (~priced).any():
+        warnings.append(
+            f"Skipped {int((~priced).sum())} holding(s) without a price: "
+            + ", ".join(df.loc[~priced, "tradingsymbol"].head(5))
+        )
+    df = df[priced]
+    if df.empty:
+        return {"orders": [], "summary": None, "groups": [], "concentration": None, "warnings": ["No holdings to rebalance."]}
+
+    df["group"] = settings.classify(df["tradingsymbol"])
+    codes, names = pd.factorize(df["group"], sort=True)
+    quantity = df["quantity"].to_numpy(dtype=float)
+    price = df["last_price"].to_numpy(dtype=float)
+    value = quantity * price
+    total = float(value.sum())
+
+    bounds = settings.targets.reindex(names)
+    has_target = bounds["min"].notna().to_numpy()
+    target_min = bounds["min"].fillna(0).to_numpy(dtype=float) / 100 * total
+    target_max = bounds["max"].fillna(100).to_numpy(dtype=float) / 100 * total
+    single_cap = settings.single_limit / 100 * total
+    top5_cap = settings.top5_limit / 100 * total
+    groups = len(names)
+
+    # 1. Concentration
+    sell_single = np.maximum(value - single_cap, 0)
+    held = value - sell_single
+    sell_top5 = np.maximum(held - _top5_level(held, top5_cap), 0)
+    held -= sell_top5
+
+    # 2. Groups above their max
+    surplus = np.maximum(np.bincount(codes, held, minlength=groups) - target_max, 0)
+    sell_max = _fill(-held, held, codes, surplus)
+    held -= sell_max
+
+    # 3. Groups below their min; raising any position by at most a fifth of
+    # the top-5 headroom over the current fifth-largest keeps that limit
+    group_value = np.bincount(codes, held, minlength=groups)
+    shortfall = np.maximum(target_min - group_value, 0)
+    top = np.sort(held)[::-1][:5]
+    fifth = top[4] if len(top) == 5 else 0.0
+    headroom = max(top5_cap - top.sum(), 0) / 5
+    buy_cap = np.minimum(single_cap, np.maximum(held, fifth) + headroom)
+    buy_room = np.maximum(buy_cap - held, 0)
+    buy = _fill(held, buy_room, codes, shortfall)
+
+    unmet = shortfall - np.bincount(codes, buy, minlength=groups)
+    for g in np.flatnonzero(unmet > SHARE_TOLERANCE * total):
+        warnings.append(
+            f"{names[g]} can only be raised by {shortfall[g] - unmet[g]:,.0f} of the {shortfall[g]:,.0f} "
+            "needed for its minimum within the concentration limits."
+        )
+
+    # 4. Fund buys the sales don't cover
+    sold = sell_single.sum() + sell_top5.sum() + sell_max.sum()
+    needed = buy.sum() - sold
+    sell_fund = np.zeros_like(value)
+    if needed > 0:
+        slack = np.where(has_target, np.maximum(group_value - target_min, 0), group_value)
+        slack[shortfall > 0] = 0
+        if slack.sum() < needed:
+            warnings.append("Group minimums add up to more than the portfolio can fund; buys are scaled down.")
+            buy *= (sold + slack.sum()) / buy.sum()
+            needed = slack.sum()
+        sell_fund = _fill(-held, held, codes, slack * (needed / slack.sum()) if slack.sum() else slack)
+
+    # Whole shares: sales round up so limits are met, buys round up within their room
+    sell_value = sell_single + sell_top5 + sell_max + sell_fund
+    sell_qty = np.minimum(np.ceil(sell_value / price - SHARE_TOLERANCE), quantity)
+    buy_qty = np.minimum(np.ceil(buy / price - SHARE_TOLERANCE), np.floor(buy_room / price + SHARE_TOLERANCE))
+    net = buy_qty - sell_qty
+
+    reasons = np.array(["single", "top5", "group_max", "funding"])
+    sell_reason = reasons[np.argmax(np.vstack([sell_single, sell_top5, sell_max, sell_fund]), axis=0)]
+
+    orders = []
+    for i in np.flatnonzero(net != 0):
+        side = "BUY" if net[i] > 0 else "SELL"
+        orders.append({
+            "symbol": df["tradingsymbol"].iat[i],
+            "group": names[codes[i]],
+            "side": side,
+            "quantity": int(abs(net[i])),
+            "price": float(price[i]),
+            "value": round(float(abs(net[i]) * price[i]), 2),
+            "reason": "group_min" if side == "BUY" else str(sell_reason[i]),
+        })
+    orders.sort(key=lambda o: (o["side"] != "SELL", -o["value"], o["symbol"]))
+
+    after = (quantity + net) * price
+    bought = float(np.maximum(net, 0) @ price)
+    sold = float(np.maximum(-net, 0) @ price)
+    cash = sold - bought
+
+    before_group = np.bincount(codes, value, minlength=groups)
+    after_group = np.bincount(codes, after, minlength=groups)
+    group_rows = []
+    for g, name in enumerate(names):
+        t = settings.config["targets"].get(name) if has_target[g] else None
+        group_rows.append({
+            "group": name,
+            "target": f"{t[0]}-{t[1]}%" if t else "—",
+            "before_pct": round(float(before_group[g] / total * 100), 1),
+            "after_pct": round(float(after_group[g] / total * 100), 1),
+        })
+
+    top5_before, single_before = _concentration(value, total)
+    top5_after, single_after = _concentration(after, total)
+
+    return {
+        "orders": orders,
+        "summary": {
+            "total_value": round(total, 2),
+            "buy_value": round(bought, 2),
+            "sell_value": round(sold, 2),
+            "turnover": round(bought + sold, 2),
+            "turnover_pct": round((bought + sold) / total * 100, 2),
+            "cash": round(cash, 2),
+        },
+        "groups": group_rows,
+        "concentration": {
+            "top5": {"limit": settings.top5_limit, "before_pct": round(top5_before, 1), "after_pct": round(top5_after, 1)},
+            "single": {"limit": settings.single_limit, "before_pct": round(single_before, 1), "after_pct": round(single_after, 1)},
+        },
+        "warnings": warnings,
+    }
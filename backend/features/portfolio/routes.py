@@ -1,15 +1,26 @@
-from fastapi import APIRouter, Request
-from .service import get_overview
-from .settings import get_settings, save_settings, reset_settings
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request
+from .service import get_overview, get_rebalance_plan
+from .settings import get_settings, get_settings_version, save_settings, reset_settings
 from .data import get_holdings
 from core.kite import is_authenticated
+from core import holdings
+from core.results import holdings_state, results
 
 router = APIRouter()
 
 
 @router.get("/overview")
-def overview():
-    return get_overview()
+async def overview(request: Request):
+    return await results.respond(
+        request, "portfolio/overview", get_settings_version(), holdings_state, lambda: asyncio.to_thread(get_overview)
+    )
+
+
+@router.get("/rebalance")
+def rebalance():
+    return get_rebalance_plan()
 
 
 @router.get("/settings")
@@ -28,10 +39,20 @@ def read_settings():
     return {"config": config, "holdings": holdings_symbols}
 
 
+@router.post("/holdings/invalidate")
+async def invalidate_holdings():
+    holdings.invalidate()
+    results.clear()
+    return {"status": "ok"}
+
+
 @router.put("/settings")
 async def update_settings(request: Request):
     body = await request.json()
-    save_settings(body)
+    try:
+        save_settings(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"status": "ok"}
 
 
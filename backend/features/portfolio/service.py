@@ -1,9 +1,17 @@
 from .data import get_holdings
 from .compute import compute_overview
-from .settings import get_settings
+from .rebalance import plan_rebalance
+from .settings import get_compiled_settings
 
 def get_overview():
     df = get_holdings()
-    config = get_settings()
+    settings = get_compiled_settings()
 
-    return compute_overview(df, config)
\ No newline at end of file
+    return compute_overview(df, settings)
+
+
+def get_rebalance_plan():
+    df = get_holdings()
+    settings = get_compiled_settings()
+
+    return plan_rebalance(df, settings)
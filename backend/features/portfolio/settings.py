@@ -1,7 +1,14 @@
-import sqlite3, json
+import threading
+from dataclasses import dataclass
+
+import pandas as pd
+
+from core.settings_store import SettingsStore
 
 DB = "settings.db"
 
+UNASSIGNED = "Unassigned"
+
 DEFAULT = {
     "groups": {
         "Metals": [],
@@ -21,49 +28,112 @@ DEFAULT = {
     }
 }
 
-def _ensure_table(conn):
-    conn.execute("CREATE TABLE IF NOT EXISTS settings (id INTEGER PRIMARY KEY, config TEXT)")
+
+@dataclass(frozen=True)
+class PortfolioSettings:
+    """
+    Settings compiled once for compute_overview(): a symbol → group index
+    instead of scanning every group's list per holding, the allocation
+    targets as a frame indexed by group and the concentration limits.
+    Rebuilt whenever the stored settings' version moves; treat as read-only.
+    """
+    version: int
+    config: dict
+    group_of: dict  # {tradingsymbol: group}, the first group listing a symbol wins
+    targets: pd.DataFrame  # columns min, max; one row per group that has a target
+    top5_limit: float
+    single_limit: float
+
+    def classify(self, symbols: pd.Series) -> pd.Series:
+        return symbols.map(self.group_of).fillna(UNASSIGNED)
+
+
+def compile_settings(config: dict, version: int = 0) -> PortfolioSettings:
+    group_of = {}
+    for group, symbols in config["groups"].items():
+        for sym in symbols:
+            group_of.setdefault(sym, group)
+
+    targets = {g: t for g, t in config["targets"].items() if t}
+    return PortfolioSettings(
+        version=version,
+        config=config,
+        group_of=group_of,
+        targets=pd.DataFrame(list(targets.values()), index=list(targets), columns=["min", "max"]),
+        top5_limit=config["concentration"]["top5"],
+        single_limit=config["concentration"]["single"],
+    )
+
+
+_store = SettingsStore(DB, "settings", DEFAULT)
+_lock = threading.Lock()
+_compiled = None  # PortfolioSettings for the store's current version
+
+
+def get_compiled_settings() -> PortfolioSettings:
+    global _compiled
+    with _lock:
+        version, config = _store.snapshot()
+        if _compiled is None or _compiled.version != version:
+            _compiled = compile_settings(config, version)
+        return _compiled
 
 
 def get_settings():
-    conn = sqlite3.connect(DB)
-    _ensure_table(conn)
+    return _store.get()
+
 
-    row = conn.execute("SELECT config FROM settings WHERE id=1").fetchone()
-    conn.close()
+def get_settings_version():
+    return _store.version
 
-    return json.loads(row[0]) if row else DEFAULT
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_settings(config: dict):
+    """Raise ValueError unless `config` has the shape compile_settings() reads."""
+    if not isinstance(config, dict):
+        raise ValueError("settings must be an object")
+
+    groups = config.get("groups")
+    if not isinstance(groups, dict) or not all(
+        isinstance(symbols, list) and all(isinstance(s, str) for s in symbols) for symbols in groups.values()
+    ):
+        raise ValueError("groups must map each group to a list of symbols")
+
+    targets = config.get("targets", {})
+    if not isinstance(targets, dict):
+        raise ValueError("targets must be an object")
+    for group, target in targets.items():
+        if target and not (isinstance(target, list) and len(target) == 2 and all(map(_is_number, target))):
+            raise ValueError(f"targets.{group} must be a [min, max] pair of numbers")
+
+    concentration = config.get("concentration")
+    if not isinstance(concentration, dict):
+        raise ValueError("concentration must be an object")
+    for key in ("top5", "single"):
+        if not _is_number(concentration.get(key)):
+            raise ValueError(f"concentration.{key} must be a number")
 
 
 def save_settings(config: dict):
-    conn = sqlite3.connect(DB)
-    _ensure_table(conn)
+    validate_settings(config)
+    targets = config.setdefault("targets", {})
 
     # ensure targets exist for every group
-    for group in config.get("groups", {}):
-        if group not in config.get("targets", {}):
-            config["targets"][group] = [0, 0]
+    for group in config["groups"]:
+        if group not in targets:
+            targets[group] = [0, 0]
 
     # remove stale targets for deleted groups
-    stale = [g for g in config.get("targets", {}) if g not in config.get("groups", {})]
+    stale = [g for g in targets if g not in config["groups"]]
     for g in stale:
-        del config["targets"][g]
+        del targets[g]
 
-    conn.execute(
-        "INSERT INTO settings (id, config) VALUES (1, ?) "
-        "ON CONFLICT(id) DO UPDATE SET config = excluded.config",
-        (json.dumps(config),)
-    )
-    conn.commit()
-    conn.close()
+    _store.save(config)
 
 
 def reset_settings():
-    conn = sqlite3.connect(DB)
-    _ensure_table(conn)
-
-    conn.execute("DELETE FROM settings WHERE id=1")
-    conn.commit()
-    conn.close()
-
-    return DEFAULT
\ No newline at end of file
+    _store.reset()
+    return DEFAULT
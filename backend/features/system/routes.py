@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from core import executor
+
+router = APIRouter()
+
+
+@router.get("/executor")
+async def executor_stats():
+    return executor.stats()
@@ -5,6 +5,10 @@ from features.auth.routes import router as auth_router
 from features.portfolio.routes import router as portfolio_router
 from features.exit.routes import router as exit_router
 from features.fragility.routes import router as fragility_router
+from features.dashboard.routes import router as dashboard_router
+from features.live.routes import router as live_router
+from features.accounts.routes import router as accounts_router
+from features.system.routes import router as system_router
 
 app = FastAPI()
 
@@ -20,3 +24,7 @@ app.include_router(auth_router, prefix="/api/auth")
 app.include_router(portfolio_router, prefix="/api/portfolio")
 app.include_router(exit_router, prefix="/api/exit")
 app.include_router(fragility_router, prefix="/api/fragility")
+app.include_router(dashboard_router, prefix="/api/dashboard")
+app.include_router(live_router, prefix="/api/live")
+app.include_router(accounts_router, prefix="/api/accounts")
+app.include_router(system_router, prefix="/api/system")